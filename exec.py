@@ -30,20 +30,26 @@
 # Troubleshoot: if pyinstaller throws an error, try deleting "build" and "dist" folders before running this command.
 
 
-import wezel
-from wezel.plugins import (
-    pyvista,
-    scipy,
-    measure,
-    transform,
-    segment,
-    align,
-    dcmri,
-)
+import multiprocessing
 
 
 if __name__ == "__main__":
 
+    # Worker processes of wezel.processes start from this script too - 
+    # in the executable they must stop here and run their task.
+    multiprocessing.freeze_support()
+
+    import wezel
+    from wezel.plugins import (
+        pyvista,
+        scipy,
+        measure,
+        transform,
+        segment,
+        align,
+        dcmri,
+    )
+
     app = wezel.app()
     
     app.add_menu(scipy.menu_filter)
@@ -1,5 +1,8 @@
-from PyInstaller.utils.hooks import collect_data_files
+from PyInstaller.utils.hooks import collect_data_files, collect_submodules
 datas = collect_data_files('wezel')
 
+# Submodules of wezel are imported on first use
+hiddenimports = collect_submodules('wezel')
+
 # Check if this is needed for python < 3.9
-# hiddenimports = ['importlib_resources']
\ No newline at end of file
+# hiddenimports = ['importlib_resources']
@@ -1,7 +1,14 @@
-import wezel.gui
-from wezel.api import app
-import wezel.menubar
-import wezel.widgets
-import wezel.displays
-import wezel.plugins
+import importlib
 
+# Submodules are imported when they are first used. Worker processes
+# of wezel.processes then import only what their computations need,
+# and not Qt or the rest of the application.
+_submodules = ['api', 'canvas', 'displays', 'gui', 'icons', 
+    'menubar', 'plugins', 'processes', 'widgets']
+
+def __getattr__(name):
+    if name == 'app':
+        return importlib.import_module('wezel.api').app
+    if name in _submodules:
+        return importlib.import_module('wezel.' + name)
+    raise AttributeError("module 'wezel' has no attribute '" + name + "'")
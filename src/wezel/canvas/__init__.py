@@ -6,6 +6,7 @@ from wezel.canvas.utils import (
     COLORMAPS,
     #makeQImage,
     colormap_to_LUT,
+    colormap_to_BGRA,
     region_grow_add, 
     region_grow_remove,
 )
@@ -13,6 +14,7 @@ from wezel.canvas.utils import (
 from wezel.canvas.canvas import (
     Canvas,
     ImageItem,
+    IndexedImageItem,
     MaskItem,
     FilterItem,
     FilterSet,
@@ -1,15 +1,15 @@
 import random
 import numpy as np
-import copy
 
 
-from PySide2.QtCore import Qt, Signal, QRectF
+from PySide2.QtCore import Qt, Signal, QRectF, QTimer
 from PySide2.QtWidgets import (QGraphicsObject, QGraphicsItem,
     QAction, QMenu, QGraphicsView, QGraphicsScene, QActionGroup)
 from PySide2.QtGui import QPixmap, QBrush, QIcon, QTransform, QCursor, QImage
 
 from wezel import canvas, icons
-from wezel.canvas.utils import colormap_to_LUT
+from wezel.canvas.utils import (colormap_to_BGRA, window_to_index, bounding_box, 
+    label_clusters, relabel_clusters, pack_mask, unpack_box)
 
 class Canvas(QGraphicsView):
     """Wrapper for ImageItem displaying it in a scrollable Widget"""
@@ -20,6 +20,9 @@ class Canvas(QGraphicsView):
     arrowKeyPress = Signal(str)
     #maskChanged = Signal()
 
+    # Minimum time in msec between two mousePositionMoved signals
+    hoverInterval = 16
+
     def __init__(self, parent=None): 
         super().__init__(parent)
         self.setScene(QGraphicsScene(self))
@@ -27,6 +30,27 @@ class Canvas(QGraphicsView):
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
         self.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
         self.toolBar = None
+        # A change of colormap only replaces the colour table
+        self.imageItemClass = IndexedImageItem
+        self._mousePosition = None
+        self._hoverTimer = QTimer(self)
+        self._hoverTimer.setSingleShot(True)
+        self._hoverTimer.setInterval(self.hoverInterval)
+        self._hoverTimer.timeout.connect(self._emitMousePosition)
+
+    def setMousePosition(self, x, y):
+        """Report a new mouse position to the listeners of mousePositionMoved.
+
+        Positions are passed on at most once every hoverInterval; positions 
+        that are reported in between are replaced by the latest one.
+        """
+        self._mousePosition = (x, y)
+        if not self._hoverTimer.isActive():
+            self._hoverTimer.start()
+
+    def _emitMousePosition(self):
+        x, y = self._mousePosition
+        self.mousePositionMoved.emit(x, y)
 
     def zoomTo(self, factor):
         self.setTransform(QTransform())
@@ -59,9 +83,9 @@ class Canvas(QGraphicsView):
 
     def setImage(self, array, center, width, cmap, lut=None):
         if lut is None:
-            lut = colormap_to_LUT(cmap)
+            lut = colormap_to_BGRA(cmap)
         self.removeItem(self.imageItem)
-        item = ImageItem(array, center, width, lut)
+        item = self.imageItemClass(array, center, width, lut)
         item._cmap = cmap
         self.scene().addItem(item)
         item.setZValue(0)
@@ -115,9 +139,8 @@ class Canvas(QGraphicsView):
             return
         if cmap is None:
             cmap = 'Greyscale'
-        RGB = colormap_to_LUT(cmap)
         self.imageItem._cmap = cmap
-        self.imageItem.setLUT(RGB)
+        self.imageItem.setLUT(colormap_to_BGRA(cmap))
         self.imageItem.setDisplay()
 
     def setWindow(self, center=None, width=None):
@@ -209,8 +232,11 @@ class ImageItem(AnyItem):
             self._center = None  
             self._cmap = None
             self._lut = None 
-            self._array_scaled = None
+            self._values = None
+            self._index = None
+            self._buffer = None
             self._BGRA = None
+            self._pixels = None
             self._qImage = None 
         
     def setArray(self, array):
@@ -220,63 +246,148 @@ class ImageItem(AnyItem):
             nx, ny = 0, 0
         self.boundingRectangle = QRectF(0, 0, nx, ny)
         self._BGRA = np.empty((ny, nx, 4), dtype=np.ubyte)
-        self._BGRA[:,:,3] = 0 
+        # Packed 32-bit view on the same memory - one word per pixel
+        self._pixels = self._BGRA.view(np.uint32).reshape((ny, nx))
+        self._setIndex(array)
+        if self._values is None:
+            # Scratch index of the window, kept with the image
+            self._index = np.empty((ny, nx), dtype=np.ubyte)
         # QImage points to self._BGRA in memory - does not need to be updated
         self._qImage = QImage(self._BGRA, self._BGRA.shape[1], self._BGRA.shape[0], QImage.Format_RGB32)
 
+    def _setIndex(self, array):
+        # QImage expects the array transposed
+        array = np.transpose(array)
+        self._values = None
+        self._buffer = None
+        if np.issubdtype(array.dtype, np.integer) and array.size > 0:
+            min, max = int(np.amin(array)), int(np.amax(array))
+            if max - min < 65536:
+                # Integer data: the stored values index a table 
+                # of colours directly, computed once per image
+                # with the smallest type that holds the index.
+                # The offset is taken in a wide type, as min can 
+                # be negative or out of range of the index type.
+                dtype = np.uint8 if max - min < 256 else np.uint16
+                self._values = np.arange(min, max+1)
+                self._index = (array.astype(np.int64) - min).astype(dtype)
+                return
+        # Other data are scaled on each render, in place in a 
+        # scratch buffer that is allocated once per image.
+        self._index = None
+        self._buffer = np.empty(array.shape, dtype=np.float32)
+
     def setWindow(self, center, width):
         self._width = width
         self._center = center
-        max = center + width/2
-        min = center - width/2
-        # Scale pixel array into byte range
-        array = np.clip(self._array, min, max)
-        array -= min
-        if max > min:
-            scale = 255/(max-min)
-            array *= scale
-        # QImage expects the array transposed
-        self._array_scaled = array.astype(np.ubyte)
-        self._array_scaled = np.transpose(self._array_scaled)
 
     def setLUT(self, lut):
-        #LUT is lookup table with values in range [0,1]
+        # LUT is a lookup table of colours packed as they are 
+        # stored in the QImage (see utils.colormap_to_BGRA).
+        # Tables are shared between images and not copied.
         if lut is None:
-            self._lut = None
-        else:
-            # Create RGB array by indexing LUT with pixel array
-            lut = 255*lut 
-            self._lut = lut.astype(np.ubyte)     
+            lut = colormap_to_BGRA('Greyscale')
+        self._lut = lut
 
     def setDisplay(self):
         if self._BGRA is None: # image is corrupted
             return
-        if self._lut is None:
-            # Greyscale image
-            for c in range(3):
-                self._BGRA[:,:,c] = self._array_scaled
+        if self._values is None:
+            # Single pass from pixel values to colours:
+            # scale into the byte range of the table and look up 
+            # the packed colour directly into the display buffer.
+            # QImage expects the array transposed.
+            window_to_index(
+                np.transpose(self._array), 
+                self._center, self._width, 
+                self._index, self._buffer)
+            np.take(self._lut, self._index, out=self._pixels, mode='clip')
         else:
-            # Create RGB array by indexing LUT with pixel array 
-            for c in range(3):
-                self._BGRA[:,:,c] = self._lut[self._array_scaled, 2-c]
+            # Rebuild the table from stored values to colours 
+            # for the current window, then look up each pixel.
+            index = np.empty(self._values.shape, dtype=np.ubyte)
+            window_to_index(self._values, self._center, self._width, index)
+            colors = self._lut[index]
+            np.take(colors, self._index, out=self._pixels, mode='clip')
         self.update()
 
     def array(self):
         return self._array    
 
 
+class IndexedImageItem(ImageItem):
+    """Displays an image as an 8-bit index into a colour table.
+
+    The windowed image is stored as a QImage with Format_Indexed8, 
+    so a change of colormap only replaces the 256 entries of the 
+    colour table and never touches the pixels. The display buffer 
+    takes a quarter of the memory of the 32-bit format. This is the 
+    default image item of the Canvas.
+    """
+
+    def setArray(self, array):
+        self._array = array
+        nx, ny = array.shape[0], array.shape[1]
+        if nx is None: # image is corrupted
+            nx, ny = 0, 0
+        self.boundingRectangle = QRectF(0, 0, nx, ny)
+        self._BGRA = None
+        self._pixels = np.empty((ny, nx), dtype=np.ubyte)
+        self._setIndex(array)
+        # QImage points to self._pixels in memory - does not need to be updated
+        self._qImage = QImage(self._pixels, nx, ny, nx, QImage.Format_Indexed8)
+
+    def setWindow(self, center, width):
+        self._width = width
+        self._center = center
+        if self._values is None:
+            # Window scaling writes straight into the display buffer
+            window_to_index(
+                np.transpose(self._array), 
+                center, width, 
+                self._pixels, self._buffer)
+        else:
+            index = np.empty(self._values.shape, dtype=np.ubyte)
+            window_to_index(self._values, center, width, index)
+            np.take(index, self._index, out=self._pixels, mode='clip')
+
+    def setDisplay(self):
+        if self._qImage is None: # image is corrupted
+            return
+        self._qImage.setColorTable(self._lut.tolist())
+        self.update()
+
+
 class MaskItem(AnyItem):
     """Displays a mask as an overlay on an image.
+
+    The undo history is saved as the difference between consecutive 
+    steps, so that each step costs memory in proportion to the edit.
+
+    Other regions on the same image can be shown underneath the mask 
+    with setLabels().
     """
     maskChanged = Signal()
+    maxUndo = 100 # Maximum number of undo steps
+    undoMemory = 64*2**20 # Memory budget of the undo history in bytes
 
     def __init__(self, imageItem, mask, opacity=0.75, color=0): 
         super().__init__(imageItem)
-        self._bin = []
-        self._current = None
+        self._bin = None
+        self._base = None # Mask at the last step in the history
+        self._undo = [] # Packed differences between steps
+        self._redo = []
+        self._modified = False
         self._BGRA = None
+        self._pixels = None
         self._qImage = None
-        self._BGR = list(reversed(self.RGB(color)))
+        self._dirty = None
+        self._clusters = None
+        self._clustersDirty = None # Box edited since the clusters were labelled
+        self._labels = None # Labels of the other regions
+        self._table = None # Colours of the labels
+        self._bit = 0 # Bit of the mask in the labels
+        self.setColor(color)
         self.boundingRectangle = None
         self.setData(mask)
         self.setOpacity(opacity)
@@ -284,6 +395,12 @@ class MaskItem(AnyItem):
     def color(self):
         return list(reversed(self._BGR))
 
+    def setColor(self, color):
+        self._BGR = list(reversed(self.RGB(color)))
+        B, G, R = [int(c) for c in self._BGR]
+        # Packed 0xAARRGGBB words of pixels outside and inside the mask
+        self._colors = np.array([0, (255 << 24) | (R << 16) | (G << 8) | B], dtype=np.uint32)
+
     def boundingRect(self): 
         """Abstract method - must be overridden."""
         if self.boundingRectangle is None:
@@ -296,85 +413,212 @@ class MaskItem(AnyItem):
             painter.drawImage(0, 0, self._qImage)
 
     def setBin(self, bin):
-        self._bin[self._current] = bin
+        current = self.bin()
+        if current is None or current.shape != bin.shape:
+            box = [0, bin.shape[0], 0, bin.shape[1]]
+        else:
+            box = bounding_box(current != bin)
+        self._bin = bin
+        if box is not None:
+            self.setDirty(*box)
+        elif self._dirty is None:
+            # Nothing has changed - mark an empty box so that 
+            # setDisplay does not redraw the whole mask.
+            self._dirty = [0, 0, 0, 0]
 
     def bin(self):
-        if self._current == None:
-            return
-        return self._bin[self._current]
+        return self._bin
+
+    def setDirty(self, x0, x1, y0, y1):
+        """Mark the box bin[x0:x1, y0:y1] for redrawing by setDisplay.
+
+        Boxes marked since the last call to setDisplay are merged. If 
+        nothing is marked, setDisplay redraws the whole mask.
+        """
+        self._modified = True
+        self._dirty = _union(self._dirty, [x0, x1, y0, y1])
+        if self._clusters is not None:
+            self._clustersDirty = _union(self._clustersDirty, [x0, x1, y0, y1])
+
+    def clusters(self):
+        """Labels and boxes of the clusters in the current mask.
+
+        The labels are computed on first use. After an edit only the 
+        clusters next to the edited box are labelled again, so that 
+        cluster operations do not need to label the whole mask.
+        """
+        if self._clusters is None:
+            self._clusters = label_clusters(self.bin())
+        elif self._clustersDirty is not None:
+            self._clusters = relabel_clusters(self._clusters, self.bin(), self._clustersDirty)
+        self._clustersDirty = None
+        return self._clusters
+
+    def _setBuffer(self):
+        shape = (self.bin().shape[1], self.bin().shape[0], 4)
+        self._BGRA = np.zeros(shape, dtype=np.ubyte)
+        self._pixels = self._BGRA.view(np.uint32).reshape(shape[:2])
+        self._qImage = QImage(self._BGRA, self._BGRA.shape[1], self._BGRA.shape[0], QImage.Format_ARGB32)
+        self._dirty = None
+        self._clusters = None
 
     def setData(self, mask):
         #array = mask.array()
         #self._bin = array != 0
         if mask is None:
             return
-        self._bin = [mask != 0]
-        self._current = 0
-        shape = (self.bin().shape[1], self.bin().shape[0], 4)
-        self._BGRA = np.zeros(shape, dtype=np.ubyte)
-        self._qImage = QImage(self._BGRA, self._BGRA.shape[1], self._BGRA.shape[0], QImage.Format_ARGB32)
+        self._bin = mask != 0
+        self._setBuffer()
+        self.setDisplay()
+        self._setHistory()
+        self.maskChanged.emit()
+
+    def setLabels(self, labels, table, bit):
+        """Display a map of region labels, with one region as mask.
+
+        Each bit in labels is a region, and table holds the packed colour
+        of each label value. The mask is the region at the given bit,
+        and is the only one that can be edited. All regions are drawn in 
+        one pass by looking up the labels in the table, so that another 
+        region can be made the mask by changing the table and the bit.
+        """
+        flag = labels.dtype.type(1 << bit)
+        self._bin = (labels & flag) != 0
+        self._labels = labels & ~flag
+        self._table = table
+        self._bit = bit
+        if self._qImage is None or self._pixels.shape != self._bin.shape[::-1]:
+            self._setBuffer()
+        self._dirty = None
         self.setDisplay()
+        self._setHistory()
         self.maskChanged.emit()
 
     def initMask(self):
         rect = self.boundingRect()
         dx, dy = rect.width(), rect.height()
-        self._bin = [np.zeros((int(dx), int(dy)), dtype=bool)]
-        self._current = 0
-        shape = (self.bin().shape[1], self.bin().shape[0], 4)
-        self._BGRA = np.zeros(shape, dtype=np.ubyte)
-        self._qImage = QImage(self._BGRA, self._BGRA.shape[1], self._BGRA.shape[0], QImage.Format_ARGB32)
+        self._bin = np.zeros((int(dx), int(dy)), dtype=bool)
+        self._setBuffer()
+        self._setHistory()
 
     def setDisplay(self):
-        if self._bin == []:
+        if self._bin is None:
             return
-        LUT = np.array([0,1], dtype=np.ubyte)
-        mask = self.bin().astype(np.ubyte)
-        mask = np.transpose(mask)
-        mask = LUT[mask]
-        for c in range(3):
-            if self._BGR[c] != 0:
-                self._BGRA[:,:,c] = mask*self._BGR[c]
-        self._BGRA[:,:,3] = mask*255
-        self.update()
+        bin = self.bin()
+        if self._dirty is None:
+            # The mask may have been edited in place
+            self._clusters = None
+            self._modified = True
+            x0, x1, y0, y1 = 0, bin.shape[0], 0, bin.shape[1]
+        else:
+            x0, x1, y0, y1 = self._dirty
+            x0, y0 = max(x0, 0), max(y0, 0)
+            x1, y1 = min(x1, bin.shape[0]), min(y1, bin.shape[1])
+        self._dirty = None
+        if x1 <= x0 or y1 <= y0:
+            return
+        # Recolour the box only - QImage expects the transpose.
+        mask = np.transpose(bin[x0:x1, y0:y1])
+        if self._labels is None:
+            self._pixels[y0:y1, x0:x1] = np.where(mask, self._colors[1], self._colors[0])
+        else:
+            labels = np.transpose(self._labels[x0:x1, y0:y1])
+            labels = labels | (mask != 0).astype(labels.dtype) << self._bit
+            self._pixels[y0:y1, x0:x1] = self._table[labels]
+        self.update(QRectF(x0, y0, x1-x0, y1-y0))
         self.maskChanged.emit()
 
     def setPixel(self, x, y, value):
         # if self._bin == []:
         #     self.initMask()
         self.bin()[x,y] = value
-        if value: 
-            self._BGRA[y,x,:3] = self._BGR
-            self._BGRA[y,x,3] = 255
-        else:
-            self._BGRA[y,x,:] = 0
+        self.setDirty(x, x+1, y, y+1)
+
+    def setPixels(self, pixels, box, value):
+        """Set the pixels selected in the box bin[x0:x1, y0:y1] to value.
+
+        pixels is a boolean array with the shape of the box.
+        """
+        x0, x1, y0, y1 = box
+        self.bin()[x0:x1, y0:y1][pixels] = value
+        self.setDirty(x0, x1, y0, y1)
 
     def extend(self):
-        if self._bin == []:
+        """Start a new step in the undo history"""
+        if self._bin is None:
             self.initMask()
-        bin = copy.deepcopy(self.bin())
-        self._bin = self._bin[:self._current+1]
-        self._bin.append(bin)
-        self._current += 1
+        self._commit()
+        self._redo = []
         self.maskChanged.emit()
 
+    def canUndo(self):
+        return self._modified or self._undo != []
+
+    def canRedo(self):
+        return self._redo != []
+
     def undo(self):
-        if self._current == None:
+        if self._bin is None:
             return
-        if self._current != 0:
-            self._current -= 1
-            self.setDisplay()
+        self._commit()
+        if self._undo != []:
+            patch = self._undo.pop()
+            self._redo.append(patch)
+            self._applyPatch(patch)
     
     def redo(self):
-        if self._current == None:
+        if self._bin is None:
             return
-        if self._current != len(self._bin)-1:
-            self._current += 1
-            self.setDisplay()
+        self._commit()
+        if self._redo != []:
+            patch = self._redo.pop()
+            self._undo.append(patch)
+            self._applyPatch(patch)
          
     def erase(self):
         self.extend()
-        self.bin().fill(False)
+        box = bounding_box(self.bin())
+        if box is not None:
+            self.bin().fill(False)
+            self.setDirty(*box)
+        self.setDisplay()
+
+    def _setHistory(self):
+        self._base = self._bin.copy()
+        self._undo = []
+        self._redo = []
+        self._modified = False
+
+    def _commit(self):
+        # Save the edits since the last step as a new step in the history
+        if not self._modified:
+            return
+        self._modified = False
+        if self._bin.shape != self._base.shape:
+            self._setHistory()
+            return
+        patch = pack_mask(self._bin != self._base)
+        if patch['box'] is None:
+            return
+        x0, x1, y0, y1 = patch['box']
+        self._base[x0:x1, y0:y1] = self._bin[x0:x1, y0:y1]
+        self._undo.append(patch)
+        self._redo = []
+        # Drop the oldest steps when the history is over budget
+        if len(self._undo) > self.maxUndo:
+            del self._undo[0]
+        nbytes = sum(p['bits'].nbytes for p in self._undo)
+        while len(self._undo) > 1 and nbytes > self.undoMemory:
+            nbytes -= self._undo.pop(0)['bits'].nbytes
+
+    def _applyPatch(self, patch):
+        # Flip the pixels that changed in a step, and redraw them
+        x0, x1, y0, y1 = patch['box']
+        diff = unpack_box(patch)
+        self._bin[x0:x1, y0:y1] ^= diff
+        self._base[x0:x1, y0:y1] ^= diff
+        self.setDirty(x0, x1, y0, y1)
+        self._modified = False
         self.setDisplay()
 
     def RGB(self, color):
@@ -453,20 +697,20 @@ class FilterItem(AnyItem):
         self.setCursor(self.cursor)
         self.setFocus()
         cnvs = self.scene().parent()
-        cnvs.mousePositionMoved.emit(self.x, self.y)
+        cnvs.setMousePosition(self.x, self.y)
 
     def hoverLeaveEvent(self, event):
         self.x = int(event.pos().x())
         self.y = int(event.pos().y())
         cnvs = self.scene().parent()
-        cnvs.mousePositionMoved.emit(self.x, self.y)  
+        cnvs.setMousePosition(self.x, self.y)  
 
     def hoverMoveEvent(self, event):
         self.x = int(event.pos().x())
         self.y = int(event.pos().y())
         self.setFocus()
         cnvs = self.scene().parent()
-        cnvs.mousePositionMoved.emit(self.x, self.y)    
+        cnvs.setMousePosition(self.x, self.y)    
 
     def wheelEvent(self, event):
         if event.delta() < 0:
@@ -550,4 +794,10 @@ class FilterSet():
         return menu
 
 
-
+def _union(box, other):
+    # Smallest box [x0, x1, y0, y1] holding both boxes, or other if box is empty
+    if box is None or box[1] <= box[0] or box[3] <= box[2]:
+        return other
+    return [
+        min(other[0], box[0]), max(other[1], box[1]), 
+        min(other[2], box[2]), max(other[3], box[3])]
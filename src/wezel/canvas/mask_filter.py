@@ -28,7 +28,7 @@ class MaskMove(canvas.FilterItem):
         self.y = int(event.pos().y())
         self.update() 
         cnvs = self.scene().parent()
-        cnvs.mousePositionMoved.emit(self.x, self.y)   
+        cnvs.setMousePosition(self.x, self.y)   
 
     def mousePressEvent(self, event):
         self.x = int(event.pos().x())
@@ -55,7 +55,7 @@ class MaskMove(canvas.FilterItem):
         if buttons == Qt.LeftButton:
             self.moveMask() 
         cnvs = self.scene().parent() 
-        cnvs.mousePositionMoved.emit(self.x, self.y)
+        cnvs.setMousePosition(self.x, self.y)
  
     def moveMask(self):
         cnvs = self.scene().parent() 
@@ -70,9 +70,11 @@ class MaskMove(canvas.FilterItem):
 class MaskBrush(canvas.FilterItem):
     """Painting or erasing tool.
     """
-    def __init__(self, brushSize=3, mode="paint"):
+    def __init__(self, brushSize=3, mode="paint", brushShape='square'):
         super().__init__()
         self.brushSize = brushSize
+        self.brushShape = brushShape
+        self.stroke = None # Last position painted in the current stroke
         self.setMode(mode)
         self.setActionPick()
 
@@ -99,18 +101,25 @@ class MaskBrush(canvas.FilterItem):
         pen.setWidth(0)
         painter.setPen(pen)
         w = int((self.brushSize - 1)/2)
-        painter.drawRect(
-            self.x-w, 
-            self.y-w, 
-            self.brushSize, 
-            self.brushSize)
+        if self.brushShape == 'disc':
+            painter.drawEllipse(
+                self.x-w, 
+                self.y-w, 
+                self.brushSize, 
+                self.brushSize)
+        else:
+            painter.drawRect(
+                self.x-w, 
+                self.y-w, 
+                self.brushSize, 
+                self.brushSize)
 
     def hoverMoveEvent(self, event):
         self.x = int(event.pos().x())
         self.y = int(event.pos().y())
         self.update() 
         cnvs = self.scene().parent()
-        cnvs.mousePositionMoved.emit(self.x, self.y)   
+        cnvs.setMousePosition(self.x, self.y)   
 
     def mousePressEvent(self, event):
         self.x = int(event.pos().x())
@@ -121,11 +130,13 @@ class MaskBrush(canvas.FilterItem):
             if item is None:
                 return
             item.extend()
+            self.stroke = None
             self.paintPixels()
 
     def mouseReleaseEvent(self, event):
         self.x = int(event.pos().x())
         self.y = int(event.pos().y())
+        self.stroke = None
         self.update()
 
     def mouseMoveEvent(self, event):
@@ -135,26 +146,39 @@ class MaskBrush(canvas.FilterItem):
         if buttons == Qt.LeftButton:
             self.paintPixels() 
         cnvs = self.scene().parent() 
-        cnvs.mousePositionMoved.emit(self.x, self.y)
+        cnvs.setMousePosition(self.x, self.y)
  
+    def brushStroke(self, shape):
+        """Pixels covered by the brush since the last position painted.
+
+        Fast mouse moves are joined up by a straight line, so that the 
+        stroke has no gaps.
+        """
+        footprint = canvas.utils.brush_footprint(self.brushSize, self.brushShape)
+        p = [self.x, self.y]
+        stroke, box = canvas.utils.brush_stroke(shape, self.stroke, p, footprint)
+        self.stroke = p
+        return stroke, box
+
     def paintPixels(self):
         cnvs = self.scene().parent() 
         item = cnvs.maskItem
         if item is None:
             return
-        w = int((self.brushSize - 1)/2)
-        for x in range(self.x-w, self.x+w+1, 1):
-            if 0 <= x < item.bin().shape[0]:
-                for y in range(self.y-w, self.y+w+1, 1):
-                    if 0 <= y < item.bin().shape[1]:
-                        item.setPixel(x, y, self.mode=="paint")
-        item.update()
+        stroke, box = self.brushStroke(item.bin().shape)
+        if stroke is None:
+            return
+        item.setPixels(stroke, box, self.mode=="paint")
+        item.setDisplay()
 
     def contextMenu(self):
         return self.actionPick.menu()
        
-    def setOptions(self, brushSize):
-        self.brushSize = brushSize
+    def setOptions(self, option):
+        if 'shape' in option:
+            self.brushShape = option['shape']
+        elif 'size' in option:
+            self.brushSize = option['size']
         self.pick()
 
     def menuOptions(self):
@@ -173,11 +197,22 @@ class MaskBrush(canvas.FilterItem):
         }
         for text, value in settings.items():
             action = QAction(text)
-            action.option = value
+            action.option = {'size': value}
             action.setCheckable(True)
             action.setChecked(value == self.brushSize)
             actionGroup.addAction(action)
             menu.addAction(action)
+
+        self.addSeparator(menu)
+
+        actionGroup = QActionGroup(menu)
+        for shape in canvas.utils.BRUSH_SHAPES:
+            action = QAction('Shape: ' + shape)
+            action.option = {'shape': shape}
+            action.setCheckable(True)
+            action.setChecked(shape == self.brushShape)
+            actionGroup.addAction(action)
+            menu.addAction(action)
         return menu
 
 
@@ -848,23 +883,12 @@ class MaskPaintByNumbers(MaskBrush):
         if item is None:
             return
         array = self.scene().parent().imageItem._array
-        min = max = None 
-        w = int((self.brushSize - 1)/2)
-        for x in range(self.x-w, self.x+w+1, 1):
-            if 0 <= x < item.bin().shape[0]:
-                for y in range(self.y-w, self.y+w+1, 1):
-                    if 0 <= y < item.bin().shape[1]:
-                        #v = self.array[x,y]
-                        v = array[x,y]
-                        if min is None:
-                            min = max = v
-                        else:
-                            if v < min:
-                                min = v
-                            if v > max:
-                                max = v
-        if min is None or max is None:
+        stroke, box = self.brushStroke(item.bin().shape)
+        if stroke is None:
             return
+        x0, x1, y0, y1 = box
+        values = array[x0:x1, y0:y1][stroke]
+        min, max = values.min(), values.max()
         if self.mode == 'paint':
             #inrange = np.logical_and(min <= self.array, self.array <= max)
             inrange = np.logical_and(min <= array, array <= max)
@@ -1022,7 +1046,7 @@ class MaskDilate(canvas.FilterItem):
                 return
             p = [self.x, self.y]
             if bin[p[0],p[1]]:
-                bin = canvas.utils.dilate_cluster(bin, p, self.kernel, mode=self.mode)
+                bin = canvas.utils.dilate_cluster(bin, p, self.kernel, mode=self.mode, clusters=item.clusters())
                 item.extend()
                 item.setBin(bin)
                 item.setDisplay()
@@ -1114,7 +1138,7 @@ class MaskShrink(MaskDilate):
                 return
             p = [self.x, self.y]
             if bin[p[0],p[1]]:
-                bin = canvas.utils.erode_cluster(bin, p, self.kernel, mode=self.mode)
+                bin = canvas.utils.erode_cluster(bin, p, self.kernel, mode=self.mode, clusters=item.clusters())
                 item.extend()
                 item.setBin(bin)
                 item.setDisplay()
@@ -1148,7 +1172,7 @@ class MaskOpen(MaskDilate):
                     self._open(p, bin)
             else:
                 if bin[p[0],p[1]]:
-                    self._open(p, bin, split=True)
+                    self._open(p, bin, split=True, clusters=item.clusters())
                 elif self.mode == 'draw':
                     cluster = self._grow_from(p)
                     cluster = canvas.utils.open_cluster(cluster, p, self.kernel, mode=self.mode)
@@ -1167,9 +1191,9 @@ class MaskOpen(MaskDilate):
         array = item._array
         return canvas.utils.pick_cluster(array, p)
 
-    def _open(self, p, bin, split=False):
+    def _open(self, p, bin, split=False, clusters=None):
         if np.count_nonzero(bin) > 0:
-            bin = canvas.utils.open_cluster(bin, p, self.kernel, mode=self.mode, split=split)
+            bin = canvas.utils.open_cluster(bin, p, self.kernel, mode=self.mode, split=split, clusters=clusters)
             item = self.scene().parent().maskItem
             if item is None:
                 return
@@ -1206,7 +1230,7 @@ class MaskClose(MaskDilate):
                     self._close(p, bin)
             else:
                 if bin[p[0],p[1]]:
-                    self._close(p, bin)
+                    self._close(p, bin, clusters=item.clusters())
                 elif self.mode == 'draw':
                     cluster = self._grow_from(p)
                     cluster = canvas.utils.close_cluster(cluster, p, self.kernel, mode=self.mode)
@@ -1225,12 +1249,12 @@ class MaskClose(MaskDilate):
         array = item._array
         return canvas.utils.pick_cluster(array, p)
 
-    def _close(self, p, bin):
+    def _close(self, p, bin, clusters=None):
         if np.count_nonzero(bin) > 0:
             item = self.scene().parent().maskItem
             if item is None:
                 return
-            bin = canvas.utils.close_cluster(bin, p, self.kernel, mode=self.mode)
+            bin = canvas.utils.close_cluster(bin, p, self.kernel, mode=self.mode, clusters=clusters)
             item.extend()
             item.setBin(bin)
             item.setDisplay()
@@ -1367,7 +1391,7 @@ class MaskWand(canvas.FilterItem):
                     self._close_open(p, bin)
             else:
                 if bin[p[0],p[1]]:
-                    self._close_open(p, bin, split=True)
+                    self._close_open(p, bin, split=True, clusters=item.clusters())
                 elif self.mode == 'draw':
                     cluster = self._grow_from(p)
                     cluster = canvas.utils.open_cluster(cluster, p, self.brightKernel, mode=self.mode)
@@ -1387,9 +1411,9 @@ class MaskWand(canvas.FilterItem):
         array = item._array
         return canvas.utils.pick_cluster(array, p)
 
-    def _close_open(self, p, bin, split=False):
+    def _close_open(self, p, bin, split=False, clusters=None):
         if np.count_nonzero(bin) > 0:
-            bin = canvas.utils.open_cluster(bin, p, self.brightKernel, mode=self.mode, split=split)
+            bin = canvas.utils.open_cluster(bin, p, self.brightKernel, mode=self.mode, split=split, clusters=clusters)
             bin = canvas.utils.close_cluster(bin, p, self.darkKernel, mode=self.mode)
             item = self.scene().parent().maskItem
             if item is None:
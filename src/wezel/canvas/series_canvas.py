@@ -1,11 +1,15 @@
+import os
 import timeit
 import random
 import numpy as np
 
+from PySide2.QtCore import QThreadPool
+
 from dbdicom.extensions import vreg
 
 from wezel import widgets, canvas
-from wezel.canvas.utils import colormap_to_LUT
+from wezel.canvas.utils import (colormap_to_BGRA, pack_labels, unpack_labels,
+    pack_crop, unpack_crop)
 
 class SeriesCanvas(canvas.Canvas):
 
@@ -37,6 +41,7 @@ class SeriesCanvas(canvas.Canvas):
             self._model.center(), 
             self._model.width(), 
             self._model.colormap(),
+            self._model.lut(),
         )
 
     def setBlank(self):
@@ -60,7 +65,8 @@ class SeriesCanvas(canvas.Canvas):
         super().setImage(array, 
             self._model.center(), 
             self._model.width(), 
-            self._model.colormap())
+            self._model.colormap(),
+            self._model.lut())
         if self.toolBar is not None:
             self.toolBar.setArray(array,
                 self._model.center(), 
@@ -74,7 +80,8 @@ class SeriesCanvas(canvas.Canvas):
 
     def removeCurrentRegion(self):
         currentIndex = self.currentIndex()
-        self._model._regions.remove(self._model._currentRegion)
+        self._model.flushMask()
+        self._model.removeRegion(self._model._currentRegion)
         if self._model._regions == []:
             self._model._currentRegion = None
             self.setMask(None)
@@ -96,7 +103,8 @@ class SeriesCanvas(canvas.Canvas):
     def addRegion(self):
         if self._model._regions != []: 
             self.saveMask()
-        self._model.addRegion()
+        if not self._model.addRegion():
+            return
         self.setMask(None, color=self._model.color())
         if self.toolBar is not None:
             self.toolBar.newRegion()
@@ -105,10 +113,25 @@ class SeriesCanvas(canvas.Canvas):
     def saveMask(self):
         self._model.setMask(self.maskItem.bin())
 
+    def setMask(self, mask, color=0, opacity=0.5):
+        item = super().setMask(mask, color=color, opacity=opacity)
+        labels = self._model.labels()
+        if labels is not None:
+            item.setLabels(labels, self._model.colorTable(), self._model.bit())
+        return item
+
     def setCurrentRegion(self, index):
         self.saveMask()
+        self._model.flushMask()
         self._model._currentRegion = self._model._regions[index]
-        self.setMask(self._model.mask(), color=self._model.color())
+        item = self.maskItem
+        labels = self._model.labels()
+        if item is None or labels is None:
+            self.setMask(self._model.mask(), color=self._model.color())
+        else:
+            # Switch the active region by changing the colour table
+            item.setColor(self._model.color())
+            item.setLabels(labels, self._model.colorTable(), self._model.bit())
         if self.toolBar is not None:
             self.toolBar.newRegion()
         #self.newRegion.emit()
@@ -134,6 +157,15 @@ class SeriesCanvas(canvas.Canvas):
     def regionNames(self):
         return self._model.regionNames()
 
+    def regionMemory(self):
+        return self._model.regionMemory()
+
+    def regionFormat(self):
+        return self._model.regionFormat
+
+    def setRegionFormat(self, format):
+        self._model.regionFormat = format
+
     def mask(self):
         return self._model.mask()
 
@@ -141,6 +173,19 @@ class SeriesCanvas(canvas.Canvas):
 
 
 class SeriesCanvasModel:
+    """Display settings and regions of the images in a series.
+
+    The regions on each image are saved in one map of labels, where each
+    region is one bit of the label. 
+
+    Regions are saved as DICOM series, or in the label map format as one 
+    compressed file per series in a folder next to the database. The 
+    format is chosen in the region list of the toolbar.
+    """
+    maxRegions = 16
+    regionFormat = 'DICOM' # or 'Label map'
+    labelMapFolder = '_wezel_regions' # appended to the database folder name
+
     def __init__(self):
         self._series = None
         self._center = {}
@@ -148,8 +193,11 @@ class SeriesCanvasModel:
         self._lut = {}
         self._cmap = {}
         self._regions = []
+        self._labels = {} # uid: labels of all regions
         self._currentRegion = None # dict
         self._currentImage = None # uid
+        self._editedMask = None # (region, uid, bin) of the mask on display
+        self._colorTable = None # (key, table) - see colorTable()
 
     def center(self):
         if self._currentImage is None:
@@ -178,6 +226,7 @@ class SeriesCanvasModel:
         self._width[self._currentImage] = width
 
     def setArray(self, uid=None, center=None, width=None, colormap=None):
+        self.flushMask()
         self._currentImage = uid
         if uid is None:
             return
@@ -185,7 +234,8 @@ class SeriesCanvasModel:
             return
         self._center[uid] = center
         self._width[uid] = width
-        self._lut[uid] = colormap_to_LUT(colormap)
+        # Reference to the shared table - not a copy
+        self._lut[uid] = colormap_to_BGRA(colormap)
         self._cmap[uid] = colormap
 
     def color(self):
@@ -193,22 +243,129 @@ class SeriesCanvasModel:
             return 0
         return self._currentRegion['color']
 
+    def bit(self):
+        if self._currentRegion is None:
+            return 0
+        return self._currentRegion['bit']
+
+    def labelType(self):
+        # Smallest integer type with one bit for each region
+        if all([r['bit'] < 8 for r in self._regions]):
+            return np.uint8
+        return np.uint16
+
+    def labels(self, uid=None):
+        """Map of the region labels on an image.
+
+        Each region is a bit in the labels, so that regions can overlap.
+        The labels are None if there are no regions on the image.
+        """
+        if uid is None:
+            uid = self._currentImage
+        if uid is None:
+            return
+        labels = None
+        if uid in self._labels:
+            labels = unpack_labels(self._labels[uid], self.labelType())
+        if self._editedMask is not None:
+            region, edited, bin = self._editedMask
+            if edited == uid:
+                if labels is None:
+                    labels = np.zeros(bin.shape, dtype=self.labelType())
+                flag = labels.dtype.type(1 << region['bit'])
+                labels &= ~flag
+                labels |= (bin != 0).astype(labels.dtype) << region['bit']
+        return labels
+
+    def colorTable(self):
+        """Packed colours of all label values, current region on top.
+
+        The table is built again only when the regions, their colours or 
+        the current region have changed. It is shared and must not be 
+        modified.
+        """
+        regions = [r for r in self._regions if r is not self._currentRegion]
+        if self._currentRegion is not None:
+            regions.append(self._currentRegion)
+        key = (self.labelType(), tuple([(r['bit'], tuple([int(c) for c in r['color']])) for r in regions]))
+        if self._colorTable is not None and self._colorTable[0] == key:
+            return self._colorTable[1]
+        values = np.arange(2**(8*np.dtype(key[0]).itemsize))
+        table = np.zeros(values.size, dtype=np.uint32)
+        for bit, (R, G, B) in key[1]:
+            inregion = (values >> bit) & 1 == 1
+            table[inregion] = (255 << 24) | (R << 16) | (G << 8) | B
+        self._colorTable = (key, table)
+        return table
+
     def mask(self):
         if self._currentRegion is None:
             return
         if self._currentImage is None:
             return
-        if self._currentImage in self._currentRegion:
-            return self._currentRegion[self._currentImage]
+        if self._editedMask is not None:
+            region, uid, bin = self._editedMask
+            if region is self._currentRegion and uid == self._currentImage:
+                return bin
+        return self.regionMask(self._currentRegion, self._currentImage)
+
+    def regionMask(self, region, uid):
+        # Mask of a region on an image, or None if it is empty
+        if uid not in self._labels:
+            return
+        return _region_mask(self._labels[uid], region['bit'], self.labelType())
 
     def setMask(self, bin):
+        # The mask on display is edited frequently, so it is only 
+        # saved in the labels by flushMask() when another mask is displayed.
         if bin is None:
             return
         if self._currentRegion is None:
             return
         if self._currentImage is None:
             return
-        self._currentRegion[self._currentImage] = bin
+        if self._editedMask is not None:
+            region, uid, _ = self._editedMask
+            if region is not self._currentRegion or uid != self._currentImage:
+                self.flushMask()
+        self._editedMask = (self._currentRegion, self._currentImage, bin)
+
+    def flushMask(self):
+        """Save the mask on display in the labels of its image.
+
+        Labels are stored cropped to the bounding box of all regions 
+        on the image. Images without regions are removed.
+        """
+        if self._editedMask is None:
+            return
+        uid = self._editedMask[1]
+        labels = self.labels(uid)
+        self._editedMask = None
+        self._setLabels(uid, labels)
+
+    def _setLabels(self, uid, labels):
+        packed = pack_labels(labels)
+        if packed['box'] is None:
+            self._labels.pop(uid, None)
+        else:
+            self._labels[uid] = packed
+
+    def regionMemory(self):
+        """Memory used by each region, in bytes.
+
+        The labels of an image hold one packed plane of bits for each 
+        region on it, so their memory is divided evenly over these regions.
+        """
+        memory = [0] * len(self._regions)
+        for packed in self._labels.values():
+            inimage = [i for i, r in enumerate(self._regions) if packed['bits'] & (1 << r['bit'])]
+            for i in inimage:
+                memory[i] += packed['planes'].nbytes / len(inimage)
+        if self._editedMask is not None:
+            region = self._editedMask[0]
+            if region in self._regions:
+                memory[self._regions.index(region)] += self._editedMask[2].nbytes
+        return memory
         
     def setColor(self, RGB):
         if self._currentRegion is None:
@@ -218,10 +375,42 @@ class SeriesCanvasModel:
     def regionNames(self):
         return [r['name'] for r in self._regions]
 
+    def newBit(self):
+        # Lowest bit not used by any region
+        bits = [r['bit'] for r in self._regions]
+        for bit in range(self.maxRegions):
+            if bit not in bits:
+                return bit
+
+    def removeRegion(self, region):
+        # Clear the bit before the region is removed, as the label type 
+        # may be too small to unpack it afterwards.
+        flag = 1 << region['bit']
+        for uid in list(self._labels.keys()):
+            if self._labels[uid]['bits'] & flag:
+                labels = self.labels(uid)
+                labels &= ~labels.dtype.type(flag)
+                self._setLabels(uid, labels)
+        self._regions.remove(region)
+
+    def addMask(self, region, uid, mask):
+        # Add a mask to the labels of an image
+        labels = self.labels(uid)
+        if labels is None:
+            labels = np.zeros(mask.shape, dtype=self.labelType())
+        labels |= (mask != 0).astype(labels.dtype) << region['bit']
+        self._setLabels(uid, labels)
+
     def regionColors(self):
         return [r['color'] for r in self._regions]
 
     def addRegion(self):
+        bit = self.newBit()
+        if bit is None:
+            if self._series is not None:
+                self._series.dialog.information(
+                    'Cannot create more than ' + str(self.maxRegions) + ' regions.')
+            return False
         # Find unique name
         newName = "New Region"
         allNames = self.regionNames()
@@ -230,9 +419,10 @@ class SeriesCanvasModel:
             count += 1 
             newName = 'New Region [' + str(count).zfill(3) + ']'
         # Add new region
-        newRegion = {'name': newName, 'color': self.newColor()}
+        newRegion = {'name': newName, 'color': self.newColor(), 'bit': bit}
         self._regions.append(newRegion)
         self._currentRegion = newRegion
+        return True
 
     def newColor(self):
         # Find unique color
@@ -270,32 +460,73 @@ class SeriesCanvasModel:
             random.randint(0,255)]
 
 
-    def saveRegions(self):
-        #start = timeit.default_timer()
-        databaseUpdated = False
+    def saveRegions(self, finished=None):
+        """Save the regions in a background thread.
+
+        In DICOM format each region is written with a single set_array() 
+        on a new sibling of the series, and slices without a mask are 
+        skipped. In label map format the labels of all regions are written 
+        to labelMapFile(). Returns True if a save was started; `finished` 
+        is then called in the GUI thread once new series are in the 
+        database.
+
+        The regions and labels are copied here, so that they can be 
+        edited while they are saved.
+        """
         series = self._series
         if not series.exists():
-            return databaseUpdated
-        images = series.instances()
+            return False
+        self.flushMask()
+        regions = []
         for region in self._regions:
-            if len(region.keys()) > 2:
-                databaseUpdated = True
-                roi_series = series.new_sibling(SeriesDescription=region['name'])
-                for cnt, image in enumerate(images):
-                    series.status.progress(cnt+1, len(images), 'Saving region '+ region['name'])
-                    uid = image.SOPInstanceUID
-                    if uid in region:
-                        array = region[uid].astype(np.float32)
-                        mask = image.copy_to(roi_series)
-                        mask.set_array(array)
-                        mask.WindowCenter = 0.5
-                        mask.WindowWidth = 1.0
-        series.status.hide()
-        #print(timeit.default_timer()-start)
-        return databaseUpdated
+            flag = 1 << region['bit']
+            if any([packed['bits'] & flag for packed in self._labels.values()]):
+                regions.append(dict(region))
+        if regions == []:
+            return False
+        # Packed labels are replaced when they change, not modified.
+        labels = dict(self._labels)
+        file = self.labelMapFile()
+        if self.regionFormat == 'Label map' and file is not None:
+            worker = widgets.Worker(_write_label_map, file, regions, labels)
+            finished = None
+        else:
+            worker = widgets.Worker(_save_regions, series, regions, labels, self.labelType())
+        worker.signals.error.connect(lambda err: series.dialog.error(
+            message = 'Regions could not be saved.\n' + str(err[1]), 
+            trace = err[2]))
+        if finished is not None:
+            worker.signals.finished.connect(finished)
+        QThreadPool.globalInstance().start(worker)
+        return True
+
+    def labelMapFile(self):
+        # File with the label map of the series, or None for a database in memory.
+        # The file is kept next to the database, so that the DICOM folder 
+        # only holds DICOM files.
+        path = self._series.path()
+        if path is None:
+            return
+        folder = os.path.basename(os.path.normpath(path)) + self.labelMapFolder
+        return os.path.join(os.path.dirname(os.path.normpath(path)), folder, self._series.uid + '.npz')
 
 
     def loadRegion(self):
+        # Regions saved as a label map of this series can be 
+        # loaded as they are, without resampling.
+        file = self.labelMapFile()
+        if file is not None and os.path.exists(file):
+            reply = self._series.dialog.question(
+                'Load the regions saved with this series?', cancel=True)
+            if reply == "Cancel":
+                return
+            if reply == "Yes":
+                self.flushMask()
+                try:
+                    self.loadLabelMap(file)
+                except:
+                    self._series.dialog.error()
+                return
         # Build list of series for all series in the same study
         seriesList = self._series.database().series()
         # Ask the user to select series to import as regions
@@ -304,35 +535,156 @@ class SeriesCanvasModel:
             title = "Please select regions to load")
         if input.cancel:
             return
+        self.flushMask()
         # Overlay each of the selected series on the displayed series
         for series in input.values[0]:
+            bit = self.newBit()
+            if bit is None:
+                self._series.dialog.information(
+                    'Cannot create more than ' + str(self.maxRegions) + ' regions.')
+                return
+            newRegion = None
             try:
                 # Add new region
                 newRegion = {
                     'name': series.instance().SeriesDescription, 
-                    'color': self.newColor()}
+                    'color': self.newColor(),
+                    'bit': bit}
+                self._regions.append(newRegion)
                 # Create overlay
                 #region, images = scipy.mask_array(series, on=self._series)
                 region, images = vreg.mask_array(series, on=self._series)
-                _add_slice_groups_to(newRegion, region, images)
+                _add_slice_groups_to(self, newRegion, region, images)
             except:
+                if newRegion in self._regions:
+                    self.removeRegion(newRegion)
                 self._series.dialog.error()
             else:
-                self._regions.append(newRegion)
                 self._currentRegion = newRegion
 
-def _add_slice_groups_to(newRegion, region, images):
+    def loadLabelMap(self, file):
+        """Add the regions in a label map file.
+
+        The labels are keyed by image, so they are only added 
+        to images of the series that are in the file.
+        """
+        regions, labels = _read_label_map(file)
+        uids = set([image.uid for image in self._series.instances()])
+        newRegions = []
+        for region in regions:
+            bit = self.newBit()
+            if bit is None:
+                self._series.dialog.information(
+                    'Cannot create more than ' + str(self.maxRegions) + ' regions.')
+                break
+            newRegion = {'name': region['name'], 'color': region['color'], 'bit': bit}
+            if newRegion['color'] in self.regionColors():
+                newRegion['color'] = self.newColor()
+            self._regions.append(newRegion)
+            newRegions.append((region['bit'], newRegion))
+        if newRegions == []:
+            return
+        for uid, packed in labels.items():
+            if uid not in uids:
+                continue
+            stored = unpack_labels(packed, np.uint16)
+            current = self.labels(uid)
+            if current is None:
+                current = np.zeros(stored.shape, dtype=self.labelType())
+            for bit, newRegion in newRegions:
+                current |= ((stored >> bit) & 1).astype(current.dtype) << newRegion['bit']
+            self._setLabels(uid, current)
+        self._currentRegion = newRegions[-1][1]
+
+
+def _write_label_map(file, regions, labels, signals=None):
+    # Write the labels of all images in one compressed file.
+    # Runs in a worker thread.
+    data = {
+        'names': np.array([r['name'] for r in regions]),
+        'colors': np.array([r['color'] for r in regions], dtype=np.uint8),
+        'bits': np.array([r['bit'] for r in regions], dtype=np.uint8),
+        'uids': np.array(list(labels.keys())),
+        'shapes': np.array([p['shape'] for p in labels.values()], dtype=np.int64).reshape(-1, 2),
+        'boxes': np.array([p['box'] for p in labels.values()], dtype=np.int64).reshape(-1, 4),
+    }
+    for i, packed in enumerate(labels.values()):
+        dtype = np.min_scalar_type(packed['bits'])
+        data['labels' + str(i)] = unpack_crop(packed, dtype)
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    np.savez_compressed(file, **data)
+
+
+def _region_mask(packed, bit, dtype):
+    # Mask of a region in packed labels, or None if it is empty
+    flag = 1 << bit
+    if packed['bits'] & flag == 0:
+        return
+    return unpack_labels(packed, dtype) & flag != 0
+
+
+def _save_regions(series, regions, labels, dtype, signals=None):
+    # Runs in a worker thread, on a copy of the regions and labels.
+    # Each database call takes the database lock on its own.
+    try:
+        images = [image for image in series.instances() if image.uid in labels]
+        for region in regions:
+            message = 'Saving region ' + region['name'] + '..'
+            # Images of different sizes cannot be stacked, so 
+            # the slices are written in one batch for each size.
+            batches = {}
+            for i, image in enumerate(images):
+                series.status.progress(i, len(images), message)
+                mask = _region_mask(labels[image.uid], region['bit'], dtype)
+                if mask is not None:
+                    headers, masks = batches.setdefault(mask.shape, ([], []))
+                    headers.append(image)
+                    masks.append(mask)
+            roi_series = series.new_sibling(SeriesDescription=region['name'])
+            for b, (headers, masks) in enumerate(batches.values()):
+                series.status.progress(b, len(batches), message)
+                # set_array() takes the headers as an array of records
+                source = np.empty(len(headers), dtype=object)
+                for i, image in enumerate(headers):
+                    source[i] = image
+                array = np.stack(masks, axis=-1).astype(np.float32)
+                roi_series.set_array(array, source, pixels_first=True, 
+                    WindowCenter = 0.5, 
+                    WindowWidth = 1.0)
+    finally:
+        series.status.hide()
+
+
+def _read_label_map(file):
+    # Regions and packed labels in a file written by _write_label_map()
+    with np.load(file) as data:
+        regions = []
+        for i, name in enumerate(data['names']):
+            regions.append({
+                'name': str(name), 
+                'color': data['colors'][i].tolist(), 
+                'bit': int(data['bits'][i])})
+        labels = {}
+        for i, uid in enumerate(data['uids']):
+            labels[str(uid)] = pack_crop(
+                data['labels' + str(i)], 
+                data['boxes'][i].tolist(), 
+                data['shapes'][i].tolist())
+    return regions, labels
+
+
+def _add_slice_groups_to(model, newRegion, region, images):
     if isinstance(region, list): 
         # If self._series has multiple slice groups
         for r, reg in enumerate(region):
-            _add_to(newRegion, reg, images[r])
+            _add_to(model, newRegion, reg, images[r])
     else:
         # Single slice group only
-        _add_to(newRegion, region, images)
+        _add_to(model, newRegion, region, images)
 
-def _add_to(newRegion, region, images):
+def _add_to(model, newRegion, region, images):
     for i, image in np.ndenumerate(images):
         if image is not None:
             mask = region[:,:,i[0],i[1]] 
             if np.count_nonzero(mask) > 0:
-                newRegion[image.SOPInstanceUID] = mask != 0
\ No newline at end of file
+                model.addMask(newRegion, image.SOPInstanceUID, mask)
\ No newline at end of file
@@ -150,8 +150,8 @@ class ToolBar(QWidget):
                 redoEnable = False
                 eraseEnable = False
             else:
-                undoEnable = item._current!=0 and item._current is not None
-                redoEnable = item._current!=len(item._bin)-1 and item._current is not None
+                undoEnable = item.canUndo()
+                redoEnable = item.canRedo()
                 # Small bug here - does not reset properly when slices
                 # are changed. Skipping for now..
                 # if item.bin() is None:
@@ -310,7 +310,10 @@ class ToolBarView():
         framegrid = QGridLayout()
         framegrid.setHorizontalSpacing(0)
         framegrid.setVerticalSpacing(0)
-        framegrid.addWidget(toolBar.regionList.comboBox,0,0,1,3)
+        framegrid.addWidget(toolBar.regionList.comboBox,0,0,1,2)
+        w = QToolBar()
+        w.addAction(toolBar.regionList.btnFormat)
+        framegrid.addWidget(w,0,2)
         w = QToolBar()
         w.addAction(toolBar.regionList.btnLoad)
         framegrid.addWidget(w,1,0)
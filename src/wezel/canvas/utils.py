@@ -4,197 +4,390 @@ from skimage import feature
 import cv2 as cv2
 
 
-def dilate_cluster(bin, p, kernel, mode='draw'):
+def dilate_cluster(bin, p, kernel, mode='draw', clusters=None):
     # Find the selected cluster
-    # mask = bin.astype(np.uint8)
-    # cluster = np.zeros(mask.shape, dtype=np.bool8)
-    # cluster = region_grow_add(mask, cluster, [p], 0.5, 1.5)
-    cluster = pick_cluster(bin, p)
-    if mode == 'draw':
-        # Take it out of the ROI
-        bin = np.logical_and(bin, np.logical_not(cluster))
-        # Dilate it
-        cluster = cv2.dilate(cluster.astype(np.uint8), kernel)
-        # Put it back into the ROI
-        bin = np.logical_or(bin, cluster.astype(np.bool8))
-    elif mode == 'cut':
-        # Dilate it
-        cluster = cv2.dilate(cluster.astype(np.uint8), kernel)
-        # Remove it from the ROI
-        bin = np.logical_and(bin, np.logical_not(cluster.astype(np.bool8)))
-    elif mode == 'rescue':
-        # Dilate it
-        cluster = cv2.dilate(cluster.astype(np.uint8), kernel)
-        # Set as ROI
-        bin = cluster
-    return bin
+    cluster, window = _cluster_window(bin, p, kernel, clusters)
+    if cluster is None:
+        return _set_cluster(bin, window, cluster, cluster, mode)
+    # Dilate it
+    dilated = cv2.dilate(cluster, kernel)
+    # Put it back into the ROI
+    return _set_cluster(bin, window, cluster, dilated, mode)
 
 
-def erode_cluster(bin, p, kernel, mode='draw'):
+def erode_cluster(bin, p, kernel, mode='draw', clusters=None):
     # Find the selected cluster
-    # mask = bin.astype(np.uint8)
-    # cluster = np.zeros(mask.shape, dtype=np.bool8)
-    # cluster = region_grow_add(mask, cluster, [p], 0.5, 1.5)
-    cluster = pick_cluster(bin, p)
-    if mode == 'draw':
-        # Take it out of the ROI
-        bin = np.logical_and(bin, np.logical_not(cluster))
-        # Erode it
-        cluster = cv2.erode(cluster.astype(np.uint8), kernel)
-        # Put it back into the ROI
-        bin = np.logical_or(bin, cluster.astype(np.bool8))
-    elif mode == 'cut':
-        # Erode it
-        cluster = cv2.erode(cluster.astype(np.uint8), kernel)
-        # Remove it from the ROI
-        bin = np.logical_and(bin, np.logical_not(cluster.astype(np.bool8)))
-    elif mode == 'rescue':
-        # Erode it
-        cluster = cv2.erode(cluster.astype(np.uint8), kernel)
-        # Set as ROI
-        bin = cluster
-    return bin
+    cluster, window = _cluster_window(bin, p, kernel, clusters)
+    if cluster is None:
+        return _set_cluster(bin, window, cluster, cluster, mode)
+    # Erode it
+    eroded = cv2.erode(cluster, kernel)
+    # Put it back into the ROI
+    return _set_cluster(bin, window, cluster, eroded, mode)
 
 
-def open_cluster(bin, p, kernel, mode='draw', split=False):
+def open_cluster(bin, p, kernel, mode='draw', split=False, clusters=None):
     # Find the selected cluster
-    cluster = pick_cluster(bin, p)
-    if mode == 'draw':
-        # Take it out of the ROI
-        bin = np.logical_and(bin, np.logical_not(cluster))
-        # Erode it then dilate it
-        if kernel is not None:
-            cluster = cv2.erode(cluster.astype(np.uint8), kernel)
-            cluster = cv2.dilate(cluster.astype(np.uint8), kernel)
-        # Pick it again in case it was split up in multiple
-        if not split:
-            cluster = pick_cluster(cluster, p)
-        # Put it back into the ROI
-        bin = np.logical_or(bin, cluster.astype(np.bool8))
-    elif mode == 'cut':
-        # Erode it then dilate it
-        if kernel is not None:
-            cluster = cv2.erode(cluster.astype(np.uint8), kernel)
-            cluster = cv2.dilate(cluster.astype(np.uint8), kernel)
-        # Pick it again in case it was split up in multiple
-        if not split:
-            cluster = pick_cluster(cluster, p)
-        # Remove it from the ROI
-        bin = np.logical_and(bin, np.logical_not(cluster.astype(np.bool8)))
-    elif mode == 'rescue':
-        # Erode it then dilate it
-        if kernel is not None:
-            cluster = cv2.erode(cluster.astype(np.uint8), kernel)
-            cluster = cv2.dilate(cluster.astype(np.uint8), kernel)
-        # Pick it again in case it was split up in multiple
-        if not split:
-            cluster = pick_cluster(cluster, p)
-        # Set as ROI
-        bin = cluster
-    return bin
+    cluster, window = _cluster_window(bin, p, kernel, clusters)
+    if cluster is None:
+        return _set_cluster(bin, window, cluster, cluster, mode)
+    # Erode it then dilate it
+    opened = cluster
+    if kernel is not None:
+        opened = cv2.erode(opened, kernel)
+        opened = cv2.dilate(opened, kernel)
+    # Pick it again in case it was split up in multiple
+    if not split:
+        opened = pick_cluster(opened, [p[0]-window[0], p[1]-window[2]])
+    # Put it back into the ROI
+    return _set_cluster(bin, window, cluster, opened, mode)
+
+
+def close_cluster(bin, p, kernel, mode='draw', clusters=None):
+    # Find the selected cluster
+    cluster, window = _cluster_window(bin, p, kernel, clusters)
+    if cluster is None:
+        return _set_cluster(bin, window, cluster, cluster, mode)
+    # Dilate and then erode
+    closed = cluster
+    if kernel is not None:
+        closed = cv2.dilate(closed, kernel)
+        closed = cv2.erode(closed, kernel)
+    # Put it back into the ROI
+    return _set_cluster(bin, window, cluster, closed, mode)
+
+
+def _cluster_window(bin, p, kernel, clusters=None):
+    """Find the cluster under p and crop it to a window around its box.
+
+    The margin around the box is wide enough for a dilation followed by 
+    an erosion with the kernel, so that morphology on the window gives 
+    the same result as on the whole mask. Returns the cropped cluster 
+    as uint8 and the window [x0, x1, y0, y1], or None, None if there is 
+    no cluster at p.
+    """
+    margin = 1 if kernel is None else max(2*(max(kernel.shape)//2), 1)
+    if clusters is None:
+        cluster = pick_cluster(bin, p)
+        box = bounding_box(cluster)
+    else:
+        label, boxes = clusters
+        picked = _picked_labels(label, p)
+        box = None
+        if picked.size != 0:
+            box = [
+                boxes[picked,0].min(), boxes[picked,1].max(), 
+                boxes[picked,2].min(), boxes[picked,3].max()]
+    if box is None:
+        return None, None
+    x0, x1 = max(box[0]-margin, 0), min(box[1]+margin, bin.shape[0])
+    y0, y1 = max(box[2]-margin, 0), min(box[3]+margin, bin.shape[1])
+    if clusters is None:
+        cluster = cluster[x0:x1, y0:y1]
+    else:
+        cluster = np.isin(label[x0:x1, y0:y1], picked)
+    return cluster.astype(np.uint8), [x0, x1, y0, y1]
 
 
-def close_cluster(bin, p, kernel, mode='draw'):
-    # Find the selected cluster
-    cluster = pick_cluster(bin, p)
+def _set_cluster(bin, window, cluster, edited, mode):
+    """Replace a cluster by its edited version in a copy of the mask.
+
+    Only the window [x0, x1, y0, y1] of the mask is changed.
+    """
+    if mode == 'rescue':
+        result = np.zeros(bin.shape, dtype=bool)
+    else:
+        result = bin != 0
+    if window is None:
+        return result
+    x0, x1, y0, y1 = window
+    roi = result[x0:x1, y0:y1]
     if mode == 'draw':
-        # Take it out of the ROI
-        bin = np.logical_and(bin, np.logical_not(cluster))
-        # Dilate and then erode
-        if kernel is not None:
-            cluster = cv2.dilate(cluster.astype(np.uint8), kernel)
-            cluster = cv2.erode(cluster.astype(np.uint8), kernel)
-        # Put it back into the ROI
-        bin = np.logical_or(bin, cluster.astype(np.bool8))
+        # Take it out of the ROI and put the edited cluster back in
+        roi &= cluster == 0
+        roi |= edited != 0
     elif mode == 'cut':
-        # Dilate and then erode
-        if kernel is not None:
-            cluster = cv2.dilate(cluster.astype(np.uint8), kernel)
-            cluster = cv2.erode(cluster.astype(np.uint8), kernel)
         # Remove it from the ROI
-        bin = np.logical_and(bin, np.logical_not(cluster.astype(np.bool8)))
+        roi &= edited == 0
     elif mode == 'rescue':
-        # Dilate and then erode
-        if kernel is not None:
-            cluster = cv2.dilate(cluster.astype(np.uint8), kernel)
-            cluster = cv2.erode(cluster.astype(np.uint8), kernel)
         # Set as ROI
-        bin = cluster
-    return bin
-
-
-def pick_cluster(bin, p):
-    mask = bin.astype(np.uint8) 
-    return region_grow_select(mask, [p], 0.5, 1.5) 
+        roi |= edited != 0
+    return result
+
+
+# Offsets of a pixel and its 4 neighbours
+_NEIGHBOURS = np.array([[0, 0], [0, -1], [1, 0], [0, 1], [-1, 0]])
+
+def _picked_labels(label, p):
+    # Labels of the pixel p and its 4 neighbours
+    q = np.add(p, _NEIGHBOURS)
+    q = q[(q[:,0] >= 0) & (q[:,1] >= 0) & (q[:,0] < label.shape[0]) & (q[:,1] < label.shape[1])]
+    picked = np.unique(label[q[:,0], q[:,1]])
+    return picked[picked != 0]
+
+
+def pick_cluster(bin, p, clusters=None):
+    """Select the cluster of the mask under pixel p.
+
+    If p is outside of the mask, all clusters next to p are selected.
+    clusters are the labels of the mask returned by label_clusters(), 
+    if available. The cluster is then found by a lookup of the label 
+    under p rather than by region growing.
+    """
+    if clusters is None:
+        mask = bin.astype(np.uint8) 
+        return region_grow_select(mask, [p], 0.5, 1.5)
+    label = clusters[0]
+    picked = _picked_labels(label, p)
+    if picked.size == 1:
+        return label == picked[0]
+    return np.isin(label, picked)
+
+
+def label_clusters(bin):
+    """Label the 4-connected clusters of a mask.
+
+    Returns an image with the label of each pixel, 0 outside of the mask, 
+    and an array with the box [x0, x1, y0, y1] of each label.
+    """
+    mask = np.ascontiguousarray(bin.astype(np.uint8) == 1)
+    n, label, stats, _ = cv2.connectedComponentsWithStats(
+        mask.view(np.uint8), connectivity=4, ltype=cv2.CV_32S)
+    box = np.empty((n, 4), dtype=int)
+    box[:,0] = stats[:,cv2.CC_STAT_TOP]
+    box[:,1] = stats[:,cv2.CC_STAT_TOP] + stats[:,cv2.CC_STAT_HEIGHT]
+    box[:,2] = stats[:,cv2.CC_STAT_LEFT]
+    box[:,3] = stats[:,cv2.CC_STAT_LEFT] + stats[:,cv2.CC_STAT_WIDTH]
+    return label, box
+
+
+def relabel_clusters(clusters, bin, box):
+    """Update the labels of label_clusters() after bin[x0:x1, y0:y1] has changed.
+
+    Only the clusters next to the box are labelled again, in the smallest 
+    window that holds all of them. New clusters get new labels and the 
+    boxes of the clusters they replace are left empty, so the labels 
+    elsewhere in the mask stay valid. When most boxes are empty, the 
+    whole mask is labelled again to keep the labels compact.
+    """
+    label, boxes = clusters
+    if label.shape != bin.shape:
+        return label_clusters(bin)
+    # Pixels next to the box can join the clusters in it
+    x0, x1 = max(box[0]-1, 0), min(box[1]+1, bin.shape[0])
+    y0, y1 = max(box[2]-1, 0), min(box[3]+1, bin.shape[1])
+    if x1 <= x0 or y1 <= y0:
+        return clusters
+    # Grow the window until it holds the clusters it touches
+    while True:
+        touched = np.unique(label[x0:x1, y0:y1])
+        touched = touched[touched != 0]
+        if touched.size == 0:
+            break
+        window = [
+            min(x0, boxes[touched,0].min()), max(x1, boxes[touched,1].max()), 
+            min(y0, boxes[touched,2].min()), max(y1, boxes[touched,3].max())]
+        if window == [x0, x1, y0, y1]:
+            break
+        x0, x1, y0, y1 = window
+    boxes[touched] = 0
+    sublabel, subboxes = label_clusters(bin[x0:x1, y0:y1])
+    offset = boxes.shape[0] - 1
+    label[x0:x1, y0:y1] = np.where(sublabel != 0, sublabel + offset, 0)
+    subboxes = subboxes[1:] + [x0, x0, y0, y0]
+    boxes = np.concatenate([boxes, subboxes])
+    live = np.count_nonzero(boxes[1:,1] > boxes[1:,0])
+    if boxes.shape[0] > 4*live + 64:
+        return label_clusters(bin)
+    return label, boxes
+
+
+def bounding_box(bin):
+    """Smallest box [x0, x1, y0, y1] containing all nonzero pixels.
+
+    The upper limits are exclusive, so that the box can be used directly
+    as slice bin[x0:x1, y0:y1]. Returns None if bin is empty.
+    """
+    x = np.flatnonzero(np.any(bin, axis=1))
+    if x.size == 0:
+        return None
+    y = np.flatnonzero(np.any(bin[x[0]:x[-1]+1, :], axis=0))
+    return [int(x[0]), int(x[-1])+1, int(y[0]), int(y[-1])+1]
+
+
+def pack_mask(mask):
+    """Compress a mask to the packed bits of its bounding box.
+
+    Returns a dict with the shape of the mask, the box [x0, x1, y0, y1]
+    and the bits inside the box, 8 pixels per byte. The box is None if
+    the mask is empty, so that the cost in memory is proportional to the
+    area of the box rather than the size of the mask.
+    """
+    box = bounding_box(mask)
+    if box is None:
+        bits = np.empty(0, dtype=np.uint8)
+    else:
+        x0, x1, y0, y1 = box
+        bits = np.packbits(mask[x0:x1, y0:y1] != 0)
+    return {'shape': tuple(mask.shape), 'box': box, 'bits': bits}
+
+
+def unpack_box(packed):
+    """Boolean array with the pixels in the box of a packed mask"""
+    x0, x1, y0, y1 = packed['box']
+    bits = np.unpackbits(packed['bits'], count=(x1-x0)*(y1-y0))
+    return bits.reshape((x1-x0, y1-y0)).view(bool)
+
+
+def unpack_mask(packed):
+    """Restore a mask compressed with pack_mask()"""
+    mask = np.zeros(packed['shape'], dtype=bool)
+    if packed['box'] is not None:
+        x0, x1, y0, y1 = packed['box']
+        mask[x0:x1, y0:y1] = unpack_box(packed)
+    return mask
+
+
+def pack_labels(labels):
+    """Crop a label map to the bounding box of its nonzero labels.
+
+    Returns a dict with the shape of the map, the box [x0, x1, y0, y1],
+    the bitwise OR of all labels and the labels inside the box, packed 
+    with pack_crop(). The box is None if all labels are zero.
+    """
+    box = bounding_box(labels)
+    if box is None:
+        return {'shape': tuple(labels.shape), 'box': None, 'planes': None, 'bits': 0}
+    x0, x1, y0, y1 = box
+    return pack_crop(labels[x0:x1, y0:y1], box, labels.shape)
+
+
+def pack_crop(crop, box, shape):
+    """Pack the labels inside the box of a label map.
+
+    Each bit that is set in any of the labels is stored as a plane of 
+    8 pixels per byte, so that the labels cost 1/8 byte per pixel for 
+    each region on the image rather than 1 or 2 bytes.
+    """
+    bits = int(np.bitwise_or.reduce(crop, axis=None))
+    planes = _bit_planes(bits)
+    stack = np.empty((len(planes),) + crop.shape, dtype=bool)
+    for i, bit in enumerate(planes):
+        stack[i] = (crop >> bit) & 1
+    return {'shape': tuple(shape), 'box': list(box), 'planes': np.packbits(stack), 'bits': bits}
+
+
+def unpack_crop(packed, dtype):
+    """Labels inside the box of a label map packed with pack_labels()"""
+    x0, x1, y0, y1 = packed['box']
+    shape = (x1-x0, y1-y0)
+    planes = _bit_planes(packed['bits'])
+    stack = np.unpackbits(packed['planes'], count=len(planes)*shape[0]*shape[1])
+    stack = stack.reshape((len(planes),) + shape).view(bool)
+    crop = np.zeros(shape, dtype=dtype)
+    for i, bit in enumerate(planes):
+        crop[stack[i]] |= crop.dtype.type(1 << bit)
+    return crop
+
+
+def unpack_labels(packed, dtype):
+    """Restore a label map packed with pack_labels()"""
+    labels = np.zeros(packed['shape'], dtype=dtype)
+    if packed['box'] is not None:
+        x0, x1, y0, y1 = packed['box']
+        labels[x0:x1, y0:y1] = unpack_crop(packed, dtype)
+    return labels
+
+
+def _bit_planes(bits):
+    # Bits that are set in an integer, lowest first
+    return [bit for bit in range(bits.bit_length()) if (bits >> bit) & 1]
+
+
+BRUSH_SHAPES = ['square', 'disc']
+
+# Cache of brush footprints, filled on first use.
+# The footprints are shared by all brushes and must not be modified.
+_BRUSH_FOOTPRINTS = {}
+
+def brush_footprint(size, shape='square'):
+    """Footprint of a brush as a uint8 kernel of shape (size, size)"""
+    if (size, shape) not in _BRUSH_FOOTPRINTS:
+        if shape == 'disc':
+            footprint = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size, size))
+        else:
+            footprint = np.ones((size, size), dtype=np.uint8)
+        footprint.setflags(write=False)
+        _BRUSH_FOOTPRINTS[(size, shape)] = footprint
+    return _BRUSH_FOOTPRINTS[(size, shape)]
+
+
+def brush_stroke(shape, p0, p1, footprint):
+    """Pixels covered by a brush moving along a line from p0 to p1.
+
+    shape is the shape of the image and footprint the brush, as returned
+    by brush_footprint(). p0 is None for a single stamp at p1.
+    Returns a boolean array with the pixels of the stroke, and the box
+    [x0, x1, y0, y1] of the image it covers. Both are None if the stroke
+    falls outside of the image.
+    """
+    if p0 is None:
+        p0 = p1
+    w = footprint.shape[0] // 2
+    # Box of the stroke, before clipping to the image
+    x0, x1 = min(p0[0], p1[0]) - w, max(p0[0], p1[0]) + w + 1
+    y0, y1 = min(p0[1], p1[1]) - w, max(p0[1], p1[1]) + w + 1
+    # Rasterise the line between the brush centers and stamp the brush
+    n = max(abs(p1[0]-p0[0]), abs(p1[1]-p0[1])) + 1
+    x = np.rint(np.linspace(p0[0], p1[0], n)).astype(int)
+    y = np.rint(np.linspace(p0[1], p1[1], n)).astype(int)
+    stroke = np.zeros((x1-x0, y1-y0), dtype=np.uint8)
+    stroke[x-x0, y-y0] = 1
+    stroke = cv2.dilate(stroke, footprint)
+    # Clip to the image
+    cx0, cx1 = max(x0, 0), min(x1, shape[0])
+    cy0, cy1 = max(y0, 0), min(y1, shape[1])
+    if cx1 <= cx0 or cy1 <= cy0:
+        return None, None
+    stroke = stroke[cx0-x0:cx1-x0, cy0-y0:cy1-y0] != 0
+    return stroke, [cx0, cx1, cy0, cy1]
+
+
+def _region_grow(img, seed, min, max, blocked=None):
+    """Find the pixels in range that are 4-connected to the seeds.
+
+    Pixels in blocked are not included, and the region does not grow 
+    through them. As in a flood fill from each seed, the region also 
+    grows from out-of-range seeds into their neighbours.
+    """
+    seed = np.asarray(seed, dtype=np.intp).reshape(-1, 2)
+    if seed.size == 0:
+        return np.zeros(img.shape, dtype=bool)
+    region = np.logical_and(min <= img, img <= max)
+    if blocked is not None:
+        region &= np.logical_not(blocked)
+    # Label connected components and select those touching the seeds
+    n, label = cv2.connectedComponents(
+        np.ascontiguousarray(region).view(np.uint8), connectivity=4, ltype=cv2.CV_32S)
+    p = (seed[:, np.newaxis, :] + _NEIGHBOURS).reshape(-1, 2)
+    p = p[(p[:,0] >= 0) & (p[:,1] >= 0) & (p[:,0] < img.shape[0]) & (p[:,1] < img.shape[1])]
+    selected = np.zeros(n, dtype=bool)
+    selected[label[p[:,0], p[:,1]]] = True
+    selected[0] = False # Background
+    return selected[label]
 
 
 def region_grow_select(img, seed, min, max):
-    selected = np.zeros(img.shape, dtype=np.bool8)
-    checked = np.zeros(img.shape, dtype=np.bool8)
-    width, height = img.shape
-    neighbours = [ 
-        [0, -1], [1, 0], 
-        [0, 1], [-1, 0],
-    ]
-    while seed != []:
-        p = seed.pop()
-        if min <= img[p[0], p[1]] <= max:
-            selected[p[0], p[1]] = True
-        for next in neighbours:
-            x = p[0] + next[0]
-            y = p[1] + next[1]
-            if x < 0 or y < 0 or x >= width or y >= height:
-                continue
-            if not checked[x,y]:
-                checked[x,y] = True
-                if min <= img[x,y] <= max:
-                    seed.append([x,y])
-    return selected
+    return _region_grow(img, seed, min, max)
 
 
 def region_grow_add(img, selected, seed, min, max):
-    width, height = img.shape
-    checked = np.copy(selected) 
-    neighbours = [ 
-        [0, -1], [1, 0], 
-        [0, 1], [-1, 0],
-    ]
-    while seed != []:
-        p = seed.pop()
-        if min <= img[p[0], p[1]] <= max:
-            selected[p[0], p[1]] = True
-        for next in neighbours:
-            x = p[0] + next[0]
-            y = p[1] + next[1]
-            if x < 0 or y < 0 or x >= width or y >= height:
-                continue
-            if not checked[x,y]:
-                checked[x,y] = True
-                if min <= img[x,y] <= max:
-                    seed.append([x,y])
+    selected |= _region_grow(img, seed, min, max, blocked=selected)
     return selected
     
 
 def region_grow_remove(img, selected, seed, min, max):
-    width, height = img.shape
-    checked = np.copy(np.logical_not(selected))
-    neighbours = [ 
-        [0, -1], [1, 0], 
-        [0, 1], [-1, 0],
-    ]
-    while seed != []:
-        p = seed.pop()
-        if min <= img[p[0], p[1]] <= max:
-            selected[p[0], p[1]] = False
-        for next in neighbours:
-            x = p[0] + next[0]
-            y = p[1] + next[1]
-            if x < 0 or y < 0 or x >= width or y >= height:
-                continue
-            if not checked[x,y]:
-                checked[x,y] = True
-                if min <= img[x,y] <= max:
-                    seed.append([x,y])
+    selected &= np.logical_not(_region_grow(img, seed, min, max, blocked=np.logical_not(selected)))
     return selected
 
 
@@ -225,16 +418,71 @@ COLORMAPS = [ # This needs to move to dbdicom - list of supported colormaps
         'tab10', 'tab20', 'tab20b', 'tab20c']),
 ]
 
-def colormap_to_LUT(cmap):
+# Process-wide cache of colormap tables, filled on first use.
+# The tables are shared by all images and must not be modified.
+_COLORMAP_TABLES = {}
+
+def _colormap_tables(cmap):
     if cmap is None:
         cmap = 'Greyscale'
-    if cmap == 'Greyscale':
-        G = np.linspace(0.0, 1.0, num=256)
-        RGB = np.transpose([G, G, G])
-    else:
-        RGBA = cm.ScalarMappable(cmap=cmap).to_rgba(np.arange(256))
-        RGB = RGBA[:,:3]
-    return RGB
+    if cmap not in _COLORMAP_TABLES:
+        if cmap == 'Greyscale':
+            G = np.linspace(0.0, 1.0, num=256)
+            RGB = np.transpose([G, G, G])
+        else:
+            RGBA = cm.ScalarMappable(cmap=cmap).to_rgba(np.arange(256))
+            RGB = np.ascontiguousarray(RGBA[:,:3])
+        BGRA = LUT_to_BGRA(RGB)
+        RGB.setflags(write=False)
+        BGRA.setflags(write=False)
+        _COLORMAP_TABLES[cmap] = (RGB, BGRA)
+    return _COLORMAP_TABLES[cmap]
+
+
+def colormap_to_LUT(cmap):
+    """RGB lookup table of a colormap with values in the range [0,1]"""
+    return _colormap_tables(cmap)[0]
+
+
+def colormap_to_BGRA(cmap):
+    """Lookup table of a colormap packed in 32-bit words 0xffRRGGBB"""
+    return _colormap_tables(cmap)[1]
+
+
+def LUT_to_BGRA(lut):
+    """Pack a lookup table into 32-bit words 0xffRRGGBB.
+
+    The table can be used as a direct colour lookup for a QImage with 
+    Format_RGB32, ARGB32 or as the colour table of an Indexed8 image. 
+    lut is an RGB lookup table with values in the range [0,1], or None for 
+    greyscale.
+    """
+    if lut is None:
+        lut = colormap_to_LUT('Greyscale')
+    RGB = (255*np.asarray(lut)[:,:3]).astype(np.uint32)
+    return (255 << 24) | (RGB[:,0] << 16) | (RGB[:,1] << 8) | RGB[:,2]
+
+
+def window_to_index(array, center, width, out, buffer=None):
+    """Scale pixel values into the byte range of a colour table.
+
+    The result is written to out, which can be an integer array of any 
+    type. Scaling is done in place in buffer, a float32 array with the same 
+    shape as array. If buffer is None, one is allocated for this call - 
+    pass a buffer that is kept between calls to avoid this.
+    """
+    max = center + width/2
+    min = center - width/2
+    if not max > min:
+        out.fill(0)
+        return out
+    if buffer is None:
+        buffer = np.empty(array.shape, dtype=np.float32)
+    np.subtract(array, min, out=buffer, casting='unsafe')
+    np.multiply(buffer, 255/(max-min), out=buffer)
+    np.clip(buffer, 0, 255, out=buffer)
+    np.copyto(out, buffer, casting='unsafe')
+    return out
 
 
 
@@ -1,15 +1,28 @@
 
+import threading
+from collections import OrderedDict
+
+from PySide2.QtCore import Signal, QThreadPool, QTimer
 from PySide2.QtWidgets import QVBoxLayout
 
 import wezel
-from wezel import widgets, canvas
+from wezel import widgets, canvas, processes
 
 
 class SeriesDisplay(wezel.gui.MainWidget):
 
+    # Emitted by the cache when it has read an image
+    _imageRead = Signal(object)
+
     def __init__(self, series=None):
         super().__init__()
 
+        self.cache = None
+        self._index = 0 # slider position of the image on display
+        self._pending = None # image waiting to be displayed
+        self._waiting = None # image waiting for the database
+        self._shown = False # True when the series is on the canvas
+        self._imageRead.connect(self._onImageRead)
         self.setupUI()
         self.setSeries(series)
 
@@ -51,9 +64,11 @@ class SeriesDisplay(wezel.gui.MainWidget):
             self.canvas.saveMask()
 
     def closeEvent(self, event):
-        newSeries = self.canvas._model.saveRegions()
-        if newSeries:
-            self.databaseUpdated.emit()
+        if self.cache is not None:
+            self.cache.stop()
+        # Regions are saved in the background - 
+        # the database is updated when they are written.
+        self.canvas._model.saveRegions(self.databaseUpdated.emit)
 
     def series(self):
         return self.canvas._model._series
@@ -64,40 +79,45 @@ class SeriesDisplay(wezel.gui.MainWidget):
         if series.instances() == []:
             self.setError('Series ' + series.label() + ' is empty. \n\n Nothing to show here..')
             return
+        if self.cache is not None:
+            self.cache.stop()
+        self.cache = ImageCache(series, self._imageRead.emit)
         self.sliders.setData(series)
         self.canvas._model._series = series
+        self._shown = False
         image = self.sliders.image
         if image is None:
             return
-        image.read()
-        array = image.array()
+        self._showFirst(image)
+
+    def _showFirst(self, image):
+        values = self.cache.get(image)
+        if values is None:
+            # The database is in use - show the image when it has been read.
+            self._waitFor(image)
+            return
+        self._waiting = None
+        array, center, width, colormap = values
         if array is None:
-            self.setError('Series ' + series.label() + ' does not contain images. \n\n Nothing to show here..')
-            image.clear()
+            self.setError('Series ' + self.series().label() + ' does not contain images. \n\n Nothing to show here..')
             return
+        self._shown = True
         self.canvas.setArray(
             array,
-            image.SOPInstanceUID, 
-            image.WindowCenter, 
-            image.WindowWidth, 
-            image.colormap,
+            image.uid, 
+            center, 
+            width, 
+            colormap,
         )
-        image.clear()
+        self.prefetch(image)
 
     def slidersChanged(self):
         image = self.sliders.image
         if image is None:
+            self._pending = None
             self.canvas.setBlank()
             return
-        image.read()
-        self.canvas.changeArray(
-            image.array(), 
-            image.SOPInstanceUID, 
-            image.WindowCenter, 
-            image.WindowWidth, 
-            image.colormap,
-        )
-        image.clear()
+        self.changeImage(image)
         
     def arrowKeyPress(self, key):
         image_before = self.sliders.image
@@ -106,12 +126,151 @@ class SeriesDisplay(wezel.gui.MainWidget):
         if image_after != image_before:
             if image_after is None:
                 return
-            image_after.read()
-            self.canvas.changeArray(
-                image_after.array(), 
-                image_after.SOPInstanceUID, 
-                image_after.WindowCenter, 
-                image_after.WindowWidth, 
-                image_after.colormap,
-            )
-            image_after.clear()
\ No newline at end of file
+            self.changeImage(image_after)
+
+    def changeImage(self, image):
+        # Images are displayed from the event loop. When they are requested 
+        # faster than they can be shown, as when an arrow key is held down, 
+        # only the last one is shown and the ones in between are skipped.
+        if self._pending is None:
+            QTimer.singleShot(0, self._showPending)
+        self._pending = image
+
+    def _showPending(self):
+        image = self._pending
+        if image is None:
+            return
+        self._pending = None
+        if not self._shown:
+            # Still waiting for the first image - show this one instead.
+            self._waitFor(image)
+            return
+        values = self.cache.get(image)
+        if values is None:
+            self._waitFor(image)
+            return
+        self._waiting = None
+        array, center, width, colormap = values
+        self.canvas.changeArray(
+            array, 
+            image.uid, 
+            center, 
+            width, 
+            colormap,
+        )
+        self.prefetch(image)
+
+    def _waitFor(self, image):
+        self._waiting = image
+        self.series().status.showMessage('Waiting for the database..')
+        self.cache.prefetch([image.uid])
+
+    def _onImageRead(self, uid):
+        if self._waiting is None or self._waiting.uid != uid:
+            return
+        if self._shown:
+            self.changeImage(self._waiting)
+        else:
+            self._showFirst(self._waiting)
+
+    def prefetch(self, image):
+        # Read ahead of the main slider, in the direction it last moved.
+        uids = self.sliders.imageUIDs()
+        if image.uid not in uids:
+            return
+        index = uids.index(image.uid)
+        step = -1 if index < self._index else 1
+        self._index = index
+        n = self.cache.readAhead
+        ahead = [index + step*i for i in range(1, n+1)]
+        behind = [index - step*i for i in range(1, n+1)]
+        self.cache.prefetch([uids[i] for i in ahead + behind if 0 <= i < len(uids)])
+
+
+class ImageCache:
+    """Decoded images of a series, with the least recently used dropped first.
+
+    Images are read when they are requested, or ahead of time in a 
+    worker thread. The cache holds at most maxBytes of pixel data. 
+
+    Images are read holding the database lock of wezel.processes. They 
+    are not loaded into memory by the database or cleared from it, so 
+    datasets that an action holds in memory are left alone. 
+    """
+    maxBytes = 256*2**20
+    readAhead = 8
+
+    def __init__(self, series, onRead=None):
+        self._series = series
+        self._onRead = onRead # called with the uid of each image read ahead
+        self._images = OrderedDict() # uid: (array, center, width, colormap)
+        self._bytes = 0
+        self._queue = [] # uids to read ahead
+        self._reading = False
+        self._lock = threading.Lock() # protects the cache itself
+
+    def get(self, image):
+        """Pixel array, window center, window width and colormap of an image.
+
+        Returns None if the image is not cached and the database is in use.
+        """
+        with self._lock:
+            if image.uid in self._images:
+                self._images.move_to_end(image.uid)
+                return self._images[image.uid]
+        # The GUI does not wait for jobs using the database
+        if not processes.lock.acquire(blocking=False):
+            return None
+        try:
+            return self._read(image)
+        finally:
+            processes.lock.release()
+
+    def prefetch(self, uids):
+        """Read images ahead in a worker thread, in the order given.
+
+        Replaces any images that are still waiting to be read.
+        """
+        with self._lock:
+            self._queue = [uid for uid in uids if uid not in self._images]
+            if self._reading or self._queue == []:
+                return
+            self._reading = True
+        QThreadPool.globalInstance().start(widgets.Worker(self._readAhead))
+
+    def stop(self):
+        with self._lock:
+            self._queue = []
+
+    def _readAhead(self, signals=None):
+        # Runs in a worker thread
+        while True:
+            with self._lock:
+                if self._queue == []:
+                    self._reading = False
+                    return
+                uid = self._queue.pop(0)
+                if uid in self._images:
+                    continue
+            try:
+                with processes.lock:
+                    self._read(self._series.instance(uid))
+            except:
+                # Errors are shown when the image is displayed
+                continue
+            if self._onRead is not None:
+                self._onRead(uid)
+
+    def _read(self, image):
+        values = (image.array(), image.WindowCenter, image.WindowWidth, image.colormap)
+        array = values[0]
+        if array is None:
+            return values
+        with self._lock:
+            if image.uid not in self._images:
+                self._images[image.uid] = values
+                self._bytes += array.nbytes
+            while self._bytes > self.maxBytes and len(self._images) > 1:
+                _, dropped = self._images.popitem(last=False)
+                self._bytes -= dropped[0].nbytes
+        return values
@@ -1,5 +1,9 @@
+import threading
+import tempfile
 import numpy as np
+import pandas as pd
 
+from PySide2.QtCore import Signal, QThreadPool, QTimer
 from PySide2.QtWidgets import (
     QWidget, 
     QSplitter,
@@ -7,7 +11,7 @@ from PySide2.QtWidgets import (
 )
 
 import wezel
-from wezel import widgets, canvas
+from wezel import widgets, canvas, processes
 
 
 class SeriesDisplay4D(wezel.gui.MainWidget):
@@ -15,11 +19,17 @@ class SeriesDisplay4D(wezel.gui.MainWidget):
     GUI for displaying a 4D numpy array
     """
 
+    # Emitted by the volume when it has read an image
+    _imageRead = Signal(int, int)
+
     def __init__(self): 
         super().__init__()
 
         self.x = None
         self.y = None
+        self.volume = None
+        self._imagePending = False
+        self._waiting = None # (z, t) of an image waiting for the database
 
         # Toolbar
         #self.toolBarClass = canvas.ToolBar
@@ -36,6 +46,7 @@ class SeriesDisplay4D(wezel.gui.MainWidget):
         self.canvas.mousePositionMoved.connect(lambda x, y: self.mouseMoved(x,y))
         self.viewSlider.valueChanged.connect(self.imageChanged)
         self.plotSlider.valueChanged.connect(self.plotChanged)
+        self._imageRead.connect(self._onImageRead)
 
         # Display
         self._view = SeriesDisplay4DView(self)
@@ -50,24 +61,43 @@ class SeriesDisplay4D(wezel.gui.MainWidget):
             self.canvas.saveMask()
 
     def closeEvent(self, event):
-        newSeries = self.canvas._model.saveRegions()
-        if newSeries:
-            self.databaseUpdated.emit()
+        if self.volume is not None:
+            self.volume.stop()
+        # Regions are saved in the background - 
+        # the database is updated when they are written.
+        self.canvas._model.saveRegions(self.databaseUpdated.emit)
 
     def imageChanged(self):
         z = self.viewSlider.value()
         t = self.plotSlider.value()
+        array = self.volume.image(z,t)
+        if array is None:
+            # The database is in use - show the image when it has been read.
+            self._waiting = (z, t)
+            self.series().status.showMessage('Waiting for the database..')
+            self.volume.prefetch(z)
+            self.setPlot()
+            return
+        self._waiting = None
         self.canvas.changeArray(
-            np.squeeze(self.array[:,:,z,t]),
-            self.uid[z,t], 
-            self.center[z,t], 
-            self.width[z,t], 
+            array,
+            self.volume.uid[z,t], 
+            self.volume.center[z,t], 
+            self.volume.width[z,t], 
             # self.lut[z,t], 
-            self.colormap[z,t],
+            self.volume.colormap[z,t],
         )
+        self.volume.prefetch(z)
         self.setStatus()
         self.setPlot() 
 
+    def _onImageRead(self, z, t):
+        if self._waiting == (z, t):
+            self.imageChanged()
+        elif z == self.viewSlider.value():
+            # Fill in the curve
+            self.setPlot()
+
     def plotChanged(self):
         self.setStatus()
         self.setPlot()        
@@ -81,6 +111,14 @@ class SeriesDisplay4D(wezel.gui.MainWidget):
             self.viewSlider.move('up')
         elif arrow == 'down':
             self.viewSlider.move('down')
+        # Held keys move the sliders on every repeat, but the 
+        # image is only shown once the previous one is done.
+        if not self._imagePending:
+            self._imagePending = True
+            QTimer.singleShot(0, self._showPending)
+
+    def _showPending(self):
+        self._imagePending = False
         self.imageChanged()
 
     def mouseMoved(self, x, y):
@@ -93,53 +131,59 @@ class SeriesDisplay4D(wezel.gui.MainWidget):
         return self.canvas._model._series
 
     def setSeries(self, series, sortby=['SliceLocation', 'InstanceNumber'], xoffset=True):
+        # The GUI does not wait for jobs using the database - try again later.
+        if not processes.lock.acquire(blocking=False):
+            series.status.message('Waiting for the database..')
+            QTimer.singleShot(500, lambda: self.setSeries(series, sortby, xoffset))
+            return
+        try:
+            self._setSeries(series, sortby, xoffset)
+        finally:
+            processes.lock.release()
+
+    def _setSeries(self, series, sortby, xoffset):
         if series.instances() == []:
             self.setError('Series ' + series.label() + ' is empty. \n\n Nothing to show here..')
             return
         self.canvas._model._series = series
-        array, header = series.array(sortby, pixels_first=True)
-
-        if array is None:
+        # Sort the images with one query of the register. 
+        # Pixel data are only read when they are needed.
+        series.status.message('Reading image properties..')
+        df = series.read_dataframe(sortby + ['SOPInstanceUID'])
+        df = df[df.SOPInstanceUID.values != None]
+        df = df.sort_values(sortby).drop_duplicates(sortby)
+        z = pd.factorize(df[sortby[0]])[0]
+        df, z = df[z >= 0], z[z >= 0]
+        t = df.groupby(z).cumcount().values
+        d = (np.amax(z)+1, np.amax(t)+1)
+        uid = np.full(d, None, dtype=object)
+        uid[z,t] = df.SOPInstanceUID.values
+        self.zcoords = np.full(d, np.nan, dtype=np.float32)
+        self.tcoords = np.full(d, np.nan, dtype=np.float32)
+        self.zcoords[z,t] = df[sortby[0]].values
+        self.tcoords[z,t] = df[sortby[1]].values
+        if self.volume is not None:
+            self.volume.stop()
+        self.volume = SeriesVolume(series, uid, self._imageRead.emit)
+        series.status.hide()
+        if self.volume.shape is None:
             self.setError('Series ' + series.label() + ' does not have images. \n\n Nothing to show here..')
             return
-        series.status.hide()
         #self.series = series
-        self.array = array[...,0].reshape(array.shape[:4])
         self.zlabel = sortby[0]
         self.tlabel = sortby[1]
-        # create index arrays
-        # Unnecessary read of all files
-        d = self.array.shape
-        self.zcoords = np.empty((d[2],d[3]), dtype=np.float32)
-        self.tcoords = np.empty((d[2],d[3]), dtype=np.float32)
-        self.uid = np.empty((d[2],d[3]), dtype=object)
-        self.center = np.empty((d[2],d[3]))
-        self.width = np.empty((d[2],d[3]))
-        self.colormap = np.empty((d[2],d[3]), dtype=object)
-
-        variables = sortby + ['SOPInstanceUID', 'WindowCenter', 'WindowWidth', 'colormap']
-        cnt = 0
-        total = d[2]*d[3]
-        for z in range(d[2]):
-            for t in range(d[3]):
-                cnt += 1
-                series.status.progress(cnt, total, 'Reading image properties..')
-                values = header[z,t,0][variables]
-                self.zcoords[z,t] = values[0]
-                self.tcoords[z,t] = values[1]
-                self.uid[z,t] = values[2]
-                self.center[z,t] = values[3]
-                self.width[z,t] = values[4]
-                self.colormap[z,t] = values[5]
-        series.status.hide()
         if xoffset:
-            self.tcoords -= np.amin(self.tcoords)
-        self.viewSlider.setMaximum(array.shape[2]-1)
-        self.plotSlider.setMaximum(array.shape[3]-1)
+            self.tcoords -= np.nanmin(self.tcoords)
+        self.viewSlider.setMaximum(d[0]-1)
+        self.plotSlider.setMaximum(d[1]-1)
         self.plot.setXlabel(self.tlabel)
         self.plot.setYlabel(series.SeriesDescription)
-        self.plot.setXlim([np.amin(self.tcoords), np.amax(self.tcoords)])
-        self.plot.setYlim([np.amin(self.center-self.width/2), np.amax(self.center+self.width/2)])
+        self.plot.setXlim([np.nanmin(self.tcoords), np.nanmax(self.tcoords)])
+        # The window of the other images is not known until they are read
+        z, t = self.viewSlider.value(), self.plotSlider.value()
+        self.volume.image(z,t)
+        center, width = self.volume.center[z,t], self.volume.width[z,t]
+        self.plot.setYlim([center-width/2, center+width/2])
 
         self.refresh()
 
@@ -155,43 +199,187 @@ class SeriesDisplay4D(wezel.gui.MainWidget):
         y = self.y
         z = self.viewSlider.value()
         t = self.plotSlider.value()
-        if (not (0 <= x < self.array.shape[0]) or
-            not (0 <= y < self.array.shape[1])):
+        if (not (0 <= x < self.volume.shape[0]) or
+            not (0 <= y < self.volume.shape[1])):
             msg = self.zlabel + ' = ' + str(self.zcoords[z,t])
             msg += ', ' + self.tlabel + ' = ' + str(self.tcoords[z,t])
         else:
-            v = self.array[x,y,z,t]
+            v = self.volume.value(x,y,z,t)
             msg = 'x = ' + str(x)
             msg += ', y = ' + str(y)
             msg += ', ' + self.zlabel + ' = ' + str(self.zcoords[z,t])
             msg += ', ' + self.tlabel + ' = ' + str(self.tcoords[z,t])
             msg += ', signal = ' + str(v)
-        self.series().status.message(msg)
+        # Called on mouse moves, so the message is shown 
+        # without the processEvents() in status.message().
+        self.series().status.showMessage(msg)
 
     def setCanvas(self):
         z = self.viewSlider.value()
         t = self.plotSlider.value()
+        array = self.volume.image(z,t)
         self.canvas.setArray(
-            np.squeeze(self.array[:,:,z,t]),
-            self.uid[z,t], 
-            self.center[z,t], 
-            self.width[z,t], 
-            self.colormap[z,t],
+            array,
+            self.volume.uid[z,t], 
+            self.volume.center[z,t], 
+            self.volume.width[z,t], 
+            self.volume.colormap[z,t],
         )
+        self.volume.prefetch(z)
 
     def setPlot(self):
         if self.x is None:
             return
         x = self.x
         y = self.y
-        if (not (0 <= x < self.array.shape[0]) or
-            not (0 <= y < self.array.shape[1])):
+        if (not (0 <= x < self.volume.shape[0]) or
+            not (0 <= y < self.volume.shape[1])):
             self.plot.clear()
         else:
             z = self.viewSlider.value()
             t = self.plotSlider.value()
-            self.plot.setData(self.tcoords[z,:], self.array[x,y,z,:], index=t)
+            self.plot.setData(self.tcoords[z,:], self.volume.curve(x,y,z), index=t)
+
+
+
+class SeriesVolume():
+    """4D pixel array of a series, read one image at a time when needed.
+
+    Images that have been read are kept in a memory-mapped temporary file, 
+    so the volume does not need to fit in memory. A worker thread reads 
+    the remaining images in the background, starting from the slice on 
+    display.
 
+    Images are read holding the database lock of wezel.processes, which 
+    the GUI thread only tries: if the database is in use, image() and 
+    value() return None and curve() returns NaN for the images that are 
+    not read yet. The volume is created holding the lock.
+    """
+
+    def __init__(self, series, uid, onRead=None):
+        self._series = series
+        self._onRead = onRead # called with (z, t) of each image read ahead
+        self.uid = uid # (z, t) array of SOPInstanceUIDs, None if missing
+        self.center = np.full(uid.shape, np.nan)
+        self.width = np.full(uid.shape, np.nan)
+        self.colormap = np.full(uid.shape, None, dtype=object)
+        self.shape = None # (x, y, z, t)
+        self._read = np.zeros(uid.shape, dtype=bool)
+        self._array = None # memmap of shape (z, t, x, y)
+        self._queue = [] # (z, t) to read in the background
+        self._reading = False
+        self._lock = threading.Lock() # protects the volume itself
+        # Read the first image to find the array size
+        for z, t in zip(*np.nonzero(uid != None)):
+            self._readImage(z, t)
+            if self._array is not None:
+                break
+
+    def image(self, z, t):
+        """Pixel array of the image at (z, t), or None if the database is in use"""
+        if not self._readNow(z, t):
+            return None
+        with self._lock:
+            return np.array(self._array[z,t,...])
+
+    def value(self, x, y, z, t):
+        """Pixel value at (x, y, z, t), or None if the database is in use"""
+        if not self._readNow(z, t):
+            return None
+        with self._lock:
+            return self._array[z,t,x,y]
+
+    def curve(self, x, y, z):
+        """Pixel values at (x, y, z) for all t.
+
+        Values of images that are not read yet are NaN. They are read in
+        the background, and onRead is called as each of them comes in.
+        """
+        with self._lock:
+            values = self._array[z,:,x,y].astype(np.float64)
+            values[~self._read[z,:]] = np.nan
+            complete = np.all(self._read[z,:])
+        if not complete:
+            self.prefetch(z)
+        return values
+
+    def prefetch(self, z):
+        """Read the images in the background, nearest to slice z first"""
+        with self._lock:
+            zt = np.argwhere(~self._read)
+            order = np.argsort(np.abs(zt[:,0] - z), kind='stable')
+            self._queue = [tuple(i) for i in zt[order]]
+            if self._reading or self._queue == []:
+                return
+            self._reading = True
+        QThreadPool.globalInstance().start(widgets.Worker(self._readAhead))
+
+    def stop(self):
+        with self._lock:
+            self._queue = []
+
+    def _readAhead(self, signals=None):
+        # Runs in a worker thread
+        while True:
+            with self._lock:
+                if self._queue == []:
+                    self._reading = False
+                    return
+                z, t = self._queue.pop(0)
+                if self._read[z,t]:
+                    continue
+            try:
+                with processes.lock:
+                    self._readImage(z, t)
+            except:
+                # Errors are shown when the image is displayed
+                continue
+            if self._onRead is not None:
+                self._onRead(z, t)
+
+    def _readNow(self, z, t):
+        # Read an image in the GUI thread, unless the database is in use
+        if self._read[z,t]:
+            return True
+        if not processes.lock.acquire(blocking=False):
+            return False
+        try:
+            self._readImage(z, t)
+        finally:
+            processes.lock.release()
+        return True
+
+    def _readImage(self, z, t):
+        # The caller holds the database lock. Images are not loaded 
+        # into memory by the database, so that datasets an action 
+        # holds in memory are left alone.
+        uid = self.uid[z,t]
+        values = None
+        if uid is not None:
+            image = self._series.instance(uid)
+            values = (image.array(), image.WindowCenter, image.WindowWidth, image.colormap)
+        with self._lock:
+            if self._read[z,t]:
+                return
+            if values is None:
+                # Missing images are left at zero
+                self._read[z,t] = self._array is not None
+                return
+            self._store(z, t, values)
+
+    def _store(self, z, t, values):
+        array, self.center[z,t], self.width[z,t], self.colormap[z,t] = values
+        if array is None:
+            self._read[z,t] = self._array is not None
+            return
+        if self._array is None:
+            nz, nt = self.uid.shape
+            self._file = tempfile.TemporaryFile()
+            self._array = np.memmap(self._file, dtype=array.dtype, mode='w+', 
+                shape=(nz, nt) + array.shape)
+            self.shape = array.shape + (nz, nt)
+        self._array[z,t,...] = array
+        self._read[z,t] = True
 
 
 class SeriesDisplay4DView():
@@ -11,7 +11,9 @@ from PySide2.QtGui import QIcon
 
 import dbdicom as db
 import wezel
+from wezel import processes
 import sys
+import threading
 
 
 # Examples of style sheets
@@ -147,6 +149,8 @@ class Main(QMainWindow):
             toolBarDockWidget (QDockWidget): A QDockWidget instance to hold the toolbar.
             treeView (None): Placeholder for the treeview widget.
             treeViewDockWidget (QDockWidget): A QDockWidget instance to hold the treeview.
+            jobQueue (object): An instance of the JobQueue class from the wezel.widgets module.
+            jobQueueDockWidget (QDockWidget): A QDockWidget instance to hold the job queue.
             folder (None): Placeholder for the folder widget.
             central (object): An instance of the MainMultipleDocumentInterface class from the wezel.widgets module.
         """
@@ -177,6 +181,12 @@ class Main(QMainWindow):
         self.addDockWidget(Qt.LeftDockWidgetArea, self.treeViewDockWidget)
         self.treeViewDockWidget.hide()
 
+        self.jobQueue = wezel.widgets.JobQueue()
+        self.jobQueueDockWidget = QDockWidget('Jobs')
+        self.jobQueueDockWidget.setWidget(self.jobQueue)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.jobQueueDockWidget)
+        self.jobQueueDockWidget.hide()
+
         self.central = wezel.widgets.MainMultipleDocumentInterface()
         self.central.subWindowActivated.connect(lambda subWindow: self.activateSubWindow(subWindow))
         self.setCentralWidget(self.central)
@@ -248,6 +258,7 @@ class Main(QMainWindow):
             self.dialog.information('There are no data to show here')
             return
         if object.type() == 'Database':
+            processes.guard(object.manager)
             self.treeView = wezel.widgets.DICOMFolderTree(object)
             self.treeView.itemSelectionChanged.connect(self.menuBar().enable)
             self.treeViewDockWidget.setWidget(self.treeView)
@@ -577,13 +588,34 @@ class Menu(QMenu):
 
 
 class Action(QAction):
+    """Menu item that runs on_clicked(app) when it is selected.
+
+    If background is True, on_clicked runs in a worker thread so that the 
+    window stays responsive. The app it receives then calls its methods in 
+    the GUI thread, so on_clicked can use app as usual, but it must not 
+    create widgets itself. 
+    
+    Background actions are added to the job queue of the app. They ask 
+    for their parameters straight away, and work on the selection at the 
+    time they were queued. The job queue starts them when they first 
+    report progress, use the app or write to the database after that - 
+    until then they may only read the database.
+    
+    Each database call holds the database lock for that call only, so 
+    that the app and other jobs can use the database in between. A 
+    background action can be cancelled from the status bar or the job 
+    queue, and then stops at its next progress update or database write. 
+    Any series it has created are removed.
+    """
+
     def __init__(self, 
             text = 'Action',
             shortcut = None,
             tooltip = None, 
             icon = None, 
             on_clicked = None,
-            is_clickable = None):
+            is_clickable = None,
+            background = False):
 
         self._app = None
         self._text = text
@@ -592,6 +624,7 @@ class Action(QAction):
         self._icon = icon
         self._on_clicked = on_clicked
         self._is_clickable = is_clickable
+        self._background = background
 
     def set_text(self, text):
         self._text = text
@@ -612,6 +645,9 @@ class Action(QAction):
             self.setToolTip(self._tooltip)
         
     def _run(self):
+        if self._on_clicked is not None and self._background:
+            self._start()
+            return
         if self._on_clicked is not None:
             try:
                 self._on_clicked(self._app)
@@ -625,6 +661,60 @@ class Action(QAction):
         self._app.status.hide()
         self._app.status.message('Ready for your next move.. Give it to me!')
 
+    def _start(self):
+        selection = {
+            'Databases': self._app.selected('Databases'),
+            'Series': self._app.selected('Series'),
+        }
+        series = selection['Series']
+        if series == []: 
+            job = wezel.widgets.Job(self._text)
+        else:
+            job = wezel.widgets.Job(self._text, set([s.uid for s in series]))
+        app = _JobApp(self._app, selection, job)
+        job.worker = wezel.widgets.Worker(self._job, app, job)
+        job.worker.signals.error.connect(self._failed)
+        job.worker.signals.finished.connect(self._finished)
+        self._app.status.jobStarted(self._text)
+        self._app.jobQueue.add(job)
+        self._app.jobQueueDockWidget.show()
+
+    def _job(self, app, job, signals=None):
+        # Runs in a worker thread
+        status = self._app.status
+        database = app.database()
+        def start():
+            # Wait for the job queue
+            job.memory = _memory(app.selected('Series'))
+            job.wait()
+        job.token.thread = threading.get_ident()
+        job.token.start = start
+        status.cancelTokens.append(job.token)
+        try:
+            # The job is started, or stopped if cancelled, before it writes.
+            with processes.tracked(job.token.check) as created:
+                self._on_clicked(app)
+        except wezel.widgets.Cancelled:
+            status.cancelTokens.remove(job.token)
+            if database is not None:
+                for series in database.series():
+                    if series.uid in created:
+                        series.remove()
+            app.refresh()
+        finally:
+            if job.token in status.cancelTokens:
+                status.cancelTokens.remove(job.token)
+
+    def _failed(self, error):
+        # Any error - report as bug
+        self._app.dialog.error(trace=error[2])
+        self._app.refresh()
+
+    def _finished(self):
+        self._app.status.jobFinished(self._text)
+        self._app.status.hide()
+        self._app.status.message('Ready for your next move.. Give it to me!')
+
     def enable(self):
         if self._is_clickable is not None:
             return self._is_clickable(self._app)
@@ -634,3 +724,77 @@ class Action(QAction):
 
 class Separator:
     pass
+
+
+class _JobApp():
+    # The app as seen by a background action: a GuiProxy that returns 
+    # the selection at the time the action was queued. The job is started
+    # when it has answered a dialog or uses the rest of the app.
+
+    def __init__(self, app, selection, job):
+        self._proxy = wezel.widgets.GuiProxy(app, wezel.widgets.GuiInvoker(), 
+            threadSafe = ['status', 'dialog'])
+        self._selection = selection
+        self._job = job
+
+    def __getattr__(self, name):
+        attr = getattr(self._proxy, name)
+        if name == 'dialog':
+            return _JobDialog(attr, self._job)
+        if name == 'status' or not callable(attr):
+            return attr
+        return _checked(attr, self._job)
+
+    def selected(self, generation='Series'):
+        if generation in self._selection:
+            return list(self._selection[generation])
+        return self._proxy.selected(generation)
+
+    def nr_selected(self, generation):
+        return len(self.selected(generation))
+
+    def database(self):
+        databases = self.selected('Databases')
+        if databases == []:
+            return
+        return databases[0]
+
+
+class _JobDialog():
+    # Dialog of a background action, which starts the job when answered.
+
+    def __init__(self, dialog, job):
+        self._dialog = dialog
+        self._job = job
+
+    def __getattr__(self, name):
+        attr = getattr(self._dialog, name)
+        if not callable(attr):
+            return attr
+        def answered(*args, **kwargs):
+            answer = attr(*args, **kwargs)
+            self._job.token.check()
+            return answer
+        return answered
+
+
+def _checked(func, job):
+    def call(*args, **kwargs):
+        job.token.check()
+        return func(*args, **kwargs)
+    return call
+
+
+def _memory(series_list):
+    # Rough estimate of the memory needed to process the series:
+    # their pixel data in double precision, and a result of the same size.
+    nbytes = 0
+    for series in series_list:
+        try:
+            instances = series.instances()
+            if instances != []:
+                first = instances[0]
+                nbytes += 2 * 8 * len(instances) * first.Rows * first.Columns
+        except:
+            pass
+    return nbytes
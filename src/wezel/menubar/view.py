@@ -50,6 +50,10 @@ def show_toolbar(app):
     #self.setEnabled(False)
 
 
+def show_jobs(app):
+    app.jobQueueDockWidget.show()
+
+
 def close_windows(app):
     app.central.closeAllSubWindows()
 
@@ -64,6 +68,7 @@ action_show_series_2d = Action('Series (2D)', on_clicked=show_series_2d, is_clic
 action_show_series_4d = Action('Series (2D + 1D)', on_clicked=show_series_4d, is_clickable=is_series_selected)
 action_show_dicom_header = Action('Series (Header)', on_clicked=show_dicom_header, is_clickable=is_series_selected)
 action_show_toolbar = Action('Toolbar', on_clicked=show_toolbar, is_clickable=no_database)
+action_show_jobs = Action('Jobs', on_clicked=show_jobs)
 action_close_windows = Action('Close windows', on_clicked=close_windows, is_clickable=no_database)
 action_tile_windows = Action('Tile windows', on_clicked=tile_windows, is_clickable=no_database)
 
@@ -77,5 +82,6 @@ menu.add(action_show_series_4d)
 menu.add(action_show_dicom_header)
 menu.add_separator()
 menu.add(action_show_toolbar)
+menu.add(action_show_jobs)
 menu.add(action_close_windows)
 menu.add(action_tile_windows)
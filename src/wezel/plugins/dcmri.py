@@ -4,6 +4,8 @@ matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import dcmri
 from wezel.gui import Action, Menu
+from wezel import processes
+from wezel.plugins import dcmri_pixels
 from wezel.displays import TableDisplay, MatplotLibDisplay
 
 def if_series_is_selected(app):
@@ -69,7 +71,8 @@ def descriptives(app):
     # Calculate maps
     f[0].message('Calculating descriptive parameters..')
     relative = f[2]['value']==0
-    maps = dcmri.pixel_descriptives(array, baseline=f[1]['value'], relative=relative)
+    maps = processes.map_pixels(dcmri_pixels.descriptives, array, f[1]['value'], relative, 
+        status=app.status)
     if relative:
         desc = ["MAX (%)", "AUC (% * sec)", "ATT (sec)", "S0 (au)"]
     else:
@@ -77,8 +80,8 @@ def descriptives(app):
 
     # Save results as DICOM
     for m, map in enumerate(maps):
-        series = f[0].new_sibling(SeriesDescription=desc[m])
-        series.set_array(map, header[:,0], pixels_first=True)
+        series = processes.write(f[0].new_sibling, SeriesDescription=desc[m])
+        processes.write(series.set_array, map, header[:,0], pixels_first=True)
         app.display(series)
     app.refresh()
 
@@ -133,13 +136,14 @@ def deconvolve(app):
 
     # Calculate maps
     f[0].message('Deconvolving..')
-    maps = dcmri.pixel_deconvolve(array, aif, time[2]-time[1], baseline=f[2]['value'])
+    maps = processes.map_pixels(dcmri_pixels.deconvolve, array, aif, time[2]-time[1], f[2]['value'], 
+        status=app.status)
     desc = ["PF (mL/min/100mL)", "VD (mL/100mL)", "TT (sec)"]
 
     # Save results as DICOM
     for m, map in enumerate(maps):
-        series = f[0].new_sibling(SeriesDescription=desc[m])
-        series.set_array(map, header[:,0], pixels_first=True)
+        series = processes.write(f[0].new_sibling, SeriesDescription=desc[m])
+        processes.write(series.set_array, map, header[:,0], pixels_first=True)
         app.display(series)
     app.refresh()
 
@@ -297,9 +301,9 @@ def fit_roi(app):
 
 
 action_check_params = Action('Check parameters..', on_clicked=check_params, is_clickable=if_series_is_selected)
-action_descriptives = Action('Descriptives..', on_clicked=descriptives, is_clickable=if_database_is_open)
+action_descriptives = Action('Descriptives..', on_clicked=descriptives, is_clickable=if_database_is_open, background=True)
 action_plot_roi = Action('Plot ROI..', on_clicked=plot_roi, is_clickable=if_database_is_open)
-action_deconvolve = Action('Model-free mapping..', on_clicked=deconvolve, is_clickable=if_database_is_open)
+action_deconvolve = Action('Model-free mapping..', on_clicked=deconvolve, is_clickable=if_database_is_open, background=True)
 action_fit_aif = Action('Fit AIF..', on_clicked=fit_aif, is_clickable=if_database_is_open)
 action_fit_roi = Action('Fit ROI..', on_clicked=fit_roi, is_clickable=if_database_is_open)
 
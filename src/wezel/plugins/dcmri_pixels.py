@@ -0,0 +1,17 @@
+"""
+Pixel computations of the dcmri plugin.
+
+These run in worker processes through wezel.processes. The module has no
+imports at the top, so that the processes do not load Qt or dbdicom - 
+dcmri itself is imported when a computation first runs.
+"""
+
+
+def descriptives(array, baseline, relative):
+    import dcmri
+    return tuple(dcmri.pixel_descriptives(array, baseline=baseline, relative=relative))
+
+
+def deconvolve(array, aif, dt, baseline):
+    import dcmri
+    return tuple(dcmri.pixel_deconvolve(array, aif, dt, baseline=baseline))
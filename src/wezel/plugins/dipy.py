@@ -218,23 +218,23 @@ def coregister_deformable_3d(app):
 
 
 # Segmentation
-action_median_otsu = Action('Median Otsu segmentation', on_clicked=median_otsu, is_clickable=_if_a_series_is_selected)
+action_median_otsu = Action('Median Otsu segmentation', on_clicked=median_otsu, is_clickable=_if_a_series_is_selected, background=True)
 
 # Coregistration
-action_align_center_of_mass_2d = Action('Align center of mass (2D)', on_clicked=_align_center_of_mass_2d, is_clickable=_if_a_database_is_open)
-action_align_center_of_mass_3d = Action('Align center of mass (3D)', on_clicked=_align_center_of_mass_3d, is_clickable=_if_a_database_is_open)
+action_align_center_of_mass_2d = Action('Align center of mass (2D)', on_clicked=_align_center_of_mass_2d, is_clickable=_if_a_database_is_open, background=True)
+action_align_center_of_mass_3d = Action('Align center of mass (3D)', on_clicked=_align_center_of_mass_3d, is_clickable=_if_a_database_is_open, background=True)
 action_align_moments_of_inertia_2d = Action('Align moments of inertia (2D)', on_clicked=_never, is_clickable=_never)
 action_align_moments_of_inertia_3d = Action('Align moments of inertia (3D)', on_clicked=_never, is_clickable=_never)
-action_coregister_translation_2d = Action('Coregister (Translation - 2D)', on_clicked=_coregister_translation_2d, is_clickable=_if_a_database_is_open)
-action_coregister_translation_3d = Action('Coregister (Translation - 3D)', on_clicked=_coregister_translation_3d, is_clickable=_if_a_database_is_open)
-action_coregister_rigid_2d = Action('Coregister (Rigid - 2D)', on_clicked=_coregister_rigid_2d, is_clickable=_if_a_database_is_open)
-action_coregister_rigid_3d = Action('Coregister (Rigid - 3D)', on_clicked=_coregister_rigid_3d, is_clickable=_if_a_database_is_open)
-action_coregister_affine_2d = Action('Coregister (Affine - 2D)', on_clicked=_coregister_affine_2d, is_clickable=_if_a_database_is_open)
-action_coregister_affine_3d = Action('Coregister (Affine - 3D)', on_clicked=_coregister_affine_3d, is_clickable=_if_a_database_is_open)
-action_coregister_deformable_2d = Action('Coregister (Deformable - 2D)', on_clicked=coregister_deformable_2d, is_clickable=_if_a_database_is_open)
-action_coregister_deformable_3d = Action('Coregister (Deformable - 3D)', on_clicked=coregister_deformable_3d, is_clickable=_if_a_database_is_open)
-action_warp = Action('Warp', on_clicked=warp, is_clickable=_if_a_database_is_open)
-action_invert_deformation = Action('Invert deformation field', on_clicked=_invert_deformation_field, is_clickable=_if_a_database_is_open)
+action_coregister_translation_2d = Action('Coregister (Translation - 2D)', on_clicked=_coregister_translation_2d, is_clickable=_if_a_database_is_open, background=True)
+action_coregister_translation_3d = Action('Coregister (Translation - 3D)', on_clicked=_coregister_translation_3d, is_clickable=_if_a_database_is_open, background=True)
+action_coregister_rigid_2d = Action('Coregister (Rigid - 2D)', on_clicked=_coregister_rigid_2d, is_clickable=_if_a_database_is_open, background=True)
+action_coregister_rigid_3d = Action('Coregister (Rigid - 3D)', on_clicked=_coregister_rigid_3d, is_clickable=_if_a_database_is_open, background=True)
+action_coregister_affine_2d = Action('Coregister (Affine - 2D)', on_clicked=_coregister_affine_2d, is_clickable=_if_a_database_is_open, background=True)
+action_coregister_affine_3d = Action('Coregister (Affine - 3D)', on_clicked=_coregister_affine_3d, is_clickable=_if_a_database_is_open, background=True)
+action_coregister_deformable_2d = Action('Coregister (Deformable - 2D)', on_clicked=coregister_deformable_2d, is_clickable=_if_a_database_is_open, background=True)
+action_coregister_deformable_3d = Action('Coregister (Deformable - 3D)', on_clicked=coregister_deformable_3d, is_clickable=_if_a_database_is_open, background=True)
+action_warp = Action('Warp', on_clicked=warp, is_clickable=_if_a_database_is_open, background=True)
+action_invert_deformation = Action('Invert deformation field', on_clicked=_invert_deformation_field, is_clickable=_if_a_database_is_open, background=True)
 
 
 menu_all = Menu('dipy')
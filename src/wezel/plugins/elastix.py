@@ -63,8 +63,8 @@ def _never(app):
     return False
 
 
-action_2d_to_2d = Action('Coregister 2D to 2D', on_clicked=_calculate_2d_to_2d, is_clickable=_if_a_database_is_open)
-action_3d_to_3d = Action('Coregister 3D to 3D', on_clicked=_calculate_3d_to_3d, is_clickable=_if_a_database_is_open)
+action_2d_to_2d = Action('Coregister 2D to 2D', on_clicked=_calculate_2d_to_2d, is_clickable=_if_a_database_is_open, background=True)
+action_3d_to_3d = Action('Coregister 3D to 3D', on_clicked=_calculate_3d_to_3d, is_clickable=_if_a_database_is_open, background=True)
 
 
 menu = Menu('Coregister (Elastix)')
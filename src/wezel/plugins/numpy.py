@@ -75,11 +75,11 @@ def calculate_relative_threshold(app):
     app.refresh()
 
 
-action_mean_intensity_projection = Action('Mean Intensity Projection', on_clicked=calculate_mean_intensity_projection, is_clickable=is_series_selected)
-action_maximum_intensity_projection = Action('Maximum Intensity Projection', on_clicked=calculate_maximum_intensity_projection, is_clickable=is_series_selected)
-action_euclidian_norm_projection = Action('Euclidian Norm Projection', on_clicked=calculate_euclidian_norm_projection, is_clickable=is_series_selected)
-action_absolute_threshold = Action('Thresholding (absolute values)', on_clicked=calculate_absolute_threshold, is_clickable=is_series_selected)
-action_relative_threshold = Action('Thresholding (relative values)', on_clicked=calculate_relative_threshold, is_clickable=is_series_selected)
+action_mean_intensity_projection = Action('Mean Intensity Projection', on_clicked=calculate_mean_intensity_projection, is_clickable=is_series_selected, background=True)
+action_maximum_intensity_projection = Action('Maximum Intensity Projection', on_clicked=calculate_maximum_intensity_projection, is_clickable=is_series_selected, background=True)
+action_euclidian_norm_projection = Action('Euclidian Norm Projection', on_clicked=calculate_euclidian_norm_projection, is_clickable=is_series_selected, background=True)
+action_absolute_threshold = Action('Thresholding (absolute values)', on_clicked=calculate_absolute_threshold, is_clickable=is_series_selected, background=True)
+action_relative_threshold = Action('Thresholding (relative values)', on_clicked=calculate_relative_threshold, is_clickable=is_series_selected, background=True)
 
 
 menu_all = Menu('numpy')
@@ -1026,42 +1026,42 @@ def _gaussian_filter_3d(app):
 action_roi_curve = Action('ROI curve', on_clicked=_roi_curve, is_clickable=_if_a_database_is_open)
 action_roi_statistics = Action('ROI statistics', on_clicked=_roi_statistics, is_clickable=_if_a_database_is_open)
 
-action_function_of_one_series = Action('y = f(series)', on_clicked=_function_of_one_series, is_clickable=_if_a_series_is_selected)
-action_function_of_two_series = Action('y = f(series 1, series 2)', on_clicked=_function_of_two_series, is_clickable=_if_a_database_is_open)
-action_function_of_n_series = Action('y = f(series 1, ..., series n)', on_clicked=_function_of_n_series, is_clickable=_if_a_database_is_open)
-
-action_fourier_shift = Action('Shift (2D)', on_clicked=_fourier_shift, is_clickable=_if_a_series_is_selected)
-action_distance_transform_edit_3d = Action('Distance transform (3D)', on_clicked=_distance_transform_edit_3d, is_clickable=_if_a_series_is_selected)
-action_binary_fill_holes = Action('Fill holes', on_clicked=_binary_fill_holes, is_clickable=_if_a_series_is_selected)
-action_label_2d = Action('Label clusters (2D)', on_clicked=_label_2d, is_clickable=_if_a_series_is_selected)
-action_label_3d = Action('Label clusters (3D)', on_clicked=_label_3d, is_clickable=_if_a_series_is_selected)
-action_extract_largest_cluster_3d = Action('Extract largest cluster (3D)', on_clicked=_extract_largest_cluster_3d, is_clickable=_if_a_series_is_selected)
-
-action_overlay_on = Action('Overlay on..', on_clicked=_overlay_on, is_clickable=_if_a_database_is_open)
-action_zoom = Action('Resample (2D)', on_clicked=_zoom, is_clickable=_if_a_series_is_selected)
-action_resample_3d = Action('Resample (3D)', on_clicked=_resample_3d, is_clickable=_if_a_series_is_selected)
-action_resample_3d_isotropic = Action('Resample isotropic (3D)', on_clicked=_resample_3d_isotropic, is_clickable=_if_a_series_is_selected)
-action_reslice_axial = Action('Reslice (axial)', on_clicked=_reslice_axial, is_clickable=_if_a_series_is_selected)
-action_reslice_coronal = Action('Reslice (coronal)', on_clicked=_reslice_coronal, is_clickable=_if_a_series_is_selected)
-action_reslice_sagittal = Action('Reslice (sagittal)', on_clicked=_reslice_sagittal, is_clickable=_if_a_series_is_selected)
-
-action_fourier_ellipsoid_filter = Action('Fourier filter (ellipsoid)', on_clicked=_fourier_ellipsoid_filter, is_clickable=_if_a_series_is_selected)
-action_fourier_uniform_filter = Action('Fourier filter (uniform)', on_clicked=_fourier_uniform_filter, is_clickable=_if_a_series_is_selected)
-action_fourier_gaussian_filter = Action('Fourier filter (Gaussian)', on_clicked=_fourier_gaussian_filter, is_clickable=_if_a_series_is_selected)
-action_gaussian_gradient_magnitude_filter = Action('Gaussian gradient magnitude filter', on_clicked=_gaussian_gradient_magnitude_filter, is_clickable=_if_a_series_is_selected)
-action_gaussian_laplace_filter = Action('Gaussian Laplace filter', on_clicked=_gaussian_laplace_filter, is_clickable=_if_a_series_is_selected)
-action_laplace_filter = Action('Laplace filter', on_clicked=_laplace_filter, is_clickable=_if_a_series_is_selected)
-action_sobel_filter = Action('Sobel filter', on_clicked=_sobel_filter, is_clickable=_if_a_series_is_selected)
-action_prewitt_filter = Action('Prewitt filter', on_clicked=_prewitt_filter, is_clickable=_if_a_series_is_selected)
-action_median_filter = Action('Median filter', on_clicked=_median_filter, is_clickable=_if_a_series_is_selected)
-action_percentile_filter = Action('Percentile filter', on_clicked=_percentile_filter, is_clickable=_if_a_series_is_selected)
-action_rank_filter = Action('Rank filter', on_clicked=_rank_filter, is_clickable=_if_a_series_is_selected)
-action_maximum_filter = Action('Maximum filter', on_clicked=_maximum_filter, is_clickable=_if_a_series_is_selected)
-action_minimum_filter = Action('Minimum filter', on_clicked=_minimum_filter, is_clickable=_if_a_series_is_selected)
-action_uniform_filter = Action('Uniform filter (2D)', on_clicked=_uniform_filter, is_clickable=_if_a_series_is_selected)
-action_uniform_filter_3d = Action('Uniform filter (3D)', on_clicked=_uniform_filter_3d, is_clickable=_if_a_series_is_selected)
-action_gaussian_filter = Action('Gaussian filter (2D)', on_clicked=_gaussian_filter, is_clickable=_if_a_series_is_selected)
-action_gaussian_filter_3d = Action('Gaussian filter (3D)', on_clicked=_gaussian_filter_3d, is_clickable=_if_a_series_is_selected)
+action_function_of_one_series = Action('y = f(series)', on_clicked=_function_of_one_series, is_clickable=_if_a_series_is_selected, background=True)
+action_function_of_two_series = Action('y = f(series 1, series 2)', on_clicked=_function_of_two_series, is_clickable=_if_a_database_is_open, background=True)
+action_function_of_n_series = Action('y = f(series 1, ..., series n)', on_clicked=_function_of_n_series, is_clickable=_if_a_database_is_open, background=True)
+
+action_fourier_shift = Action('Shift (2D)', on_clicked=_fourier_shift, is_clickable=_if_a_series_is_selected, background=True)
+action_distance_transform_edit_3d = Action('Distance transform (3D)', on_clicked=_distance_transform_edit_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_binary_fill_holes = Action('Fill holes', on_clicked=_binary_fill_holes, is_clickable=_if_a_series_is_selected, background=True)
+action_label_2d = Action('Label clusters (2D)', on_clicked=_label_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_label_3d = Action('Label clusters (3D)', on_clicked=_label_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_extract_largest_cluster_3d = Action('Extract largest cluster (3D)', on_clicked=_extract_largest_cluster_3d, is_clickable=_if_a_series_is_selected, background=True)
+
+action_overlay_on = Action('Overlay on..', on_clicked=_overlay_on, is_clickable=_if_a_database_is_open, background=True)
+action_zoom = Action('Resample (2D)', on_clicked=_zoom, is_clickable=_if_a_series_is_selected, background=True)
+action_resample_3d = Action('Resample (3D)', on_clicked=_resample_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_resample_3d_isotropic = Action('Resample isotropic (3D)', on_clicked=_resample_3d_isotropic, is_clickable=_if_a_series_is_selected, background=True)
+action_reslice_axial = Action('Reslice (axial)', on_clicked=_reslice_axial, is_clickable=_if_a_series_is_selected, background=True)
+action_reslice_coronal = Action('Reslice (coronal)', on_clicked=_reslice_coronal, is_clickable=_if_a_series_is_selected, background=True)
+action_reslice_sagittal = Action('Reslice (sagittal)', on_clicked=_reslice_sagittal, is_clickable=_if_a_series_is_selected, background=True)
+
+action_fourier_ellipsoid_filter = Action('Fourier filter (ellipsoid)', on_clicked=_fourier_ellipsoid_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_fourier_uniform_filter = Action('Fourier filter (uniform)', on_clicked=_fourier_uniform_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_fourier_gaussian_filter = Action('Fourier filter (Gaussian)', on_clicked=_fourier_gaussian_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_gaussian_gradient_magnitude_filter = Action('Gaussian gradient magnitude filter', on_clicked=_gaussian_gradient_magnitude_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_gaussian_laplace_filter = Action('Gaussian Laplace filter', on_clicked=_gaussian_laplace_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_laplace_filter = Action('Laplace filter', on_clicked=_laplace_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_sobel_filter = Action('Sobel filter', on_clicked=_sobel_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_prewitt_filter = Action('Prewitt filter', on_clicked=_prewitt_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_median_filter = Action('Median filter', on_clicked=_median_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_percentile_filter = Action('Percentile filter', on_clicked=_percentile_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_rank_filter = Action('Rank filter', on_clicked=_rank_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_maximum_filter = Action('Maximum filter', on_clicked=_maximum_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_minimum_filter = Action('Minimum filter', on_clicked=_minimum_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_uniform_filter = Action('Uniform filter (2D)', on_clicked=_uniform_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_uniform_filter_3d = Action('Uniform filter (3D)', on_clicked=_uniform_filter_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_gaussian_filter = Action('Gaussian filter (2D)', on_clicked=_gaussian_filter, is_clickable=_if_a_series_is_selected, background=True)
+action_gaussian_filter_3d = Action('Gaussian filter (3D)', on_clicked=_gaussian_filter_3d, is_clickable=_if_a_series_is_selected, background=True)
 
 menu_roi = Menu('Region')
 menu_roi.add(action_roi_curve)
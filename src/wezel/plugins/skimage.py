@@ -465,30 +465,30 @@ def _mdr_constant_3d(app):
 
 
 action_volume_features = Action('3D volume features', on_clicked=_volume_features, is_clickable=_if_a_series_is_selected)
-action_area_opening_2d = Action('Remove bright spots with area less than.. (2D)', on_clicked=_area_opening_2d, is_clickable=_if_a_series_is_selected)
-action_area_opening_3d = Action('Remove bright spots with area less than.. (3D)', on_clicked=_area_opening_3d, is_clickable=_if_a_series_is_selected)
-action_area_closing_2d = Action('Remove dark spots with area less than.. (2D)', on_clicked=_area_closing_2d, is_clickable=_if_a_series_is_selected)
-action_area_closing_3d = Action('Remove dark spots with area less than.. (3D)', on_clicked=_area_closing_3d, is_clickable=_if_a_series_is_selected)
-action_opening_2d = Action('Remove bright spots (2D)', on_clicked=_opening_2d, is_clickable=_if_a_series_is_selected)
-action_opening_3d = Action('Remove bright spots (3D)', on_clicked=_opening_3d, is_clickable=_if_a_series_is_selected)
-action_closing_2d = Action('Remove dark spots (2D)', on_clicked=_closing_2d, is_clickable=_if_a_series_is_selected)
-action_closing_3d = Action('Remove dark spots (3D)', on_clicked=_closing_3d, is_clickable=_if_a_series_is_selected)
-action_remove_small_holes_2d = Action('Remove small holes (2D)', on_clicked=_remove_small_holes_2d, is_clickable=_if_a_series_is_selected)
-action_remove_small_holes_3d = Action('Remove small holes (3D)', on_clicked=_remove_small_holes_3d, is_clickable=_if_a_series_is_selected)
-action_skeletonize_2d = Action('Skeletonize (2D)', on_clicked=_skeletonize_2d, is_clickable=_if_a_series_is_selected)
-action_skeletonize_3d = Action('Skeletonize (3D)', on_clicked=_skeletonize_3d, is_clickable=_if_a_series_is_selected)
-action_convex_hull_image_2d = Action('Convex Hull (2D)', on_clicked=_convex_hull_image_2d, is_clickable=_if_a_series_is_selected)
-action_convex_hull_image_3d = Action('Convex Hull (3D)', on_clicked=_convex_hull_image_3d, is_clickable=_if_a_series_is_selected)
-action_canny = Action('Canny Edge Detection', on_clicked=_canny, is_clickable=_if_a_series_is_selected)
-action_peak_local_max_3d = Action('Peak local maximum (3D)', on_clicked=_peak_local_max_3d, is_clickable=_if_a_series_is_selected)
-action_watershed_2d = Action('Watershed (2D)', on_clicked=_watershed_2d, is_clickable=_if_a_series_is_selected)
-action_watershed_3d = Action('Watershed (3D)', on_clicked=_watershed_3d, is_clickable=_if_a_series_is_selected)
-action_warp = Action('Warp', on_clicked=_warp, is_clickable=_if_a_database_is_open)
-action_coregistration_2d_to_2d = Action('Coregister (2D to 2D)', on_clicked=_coregistration_2d_to_2d, is_clickable=_if_a_database_is_open)
-action_coregistration_3d_to_3d = Action('Coregister (3D to 3D)', on_clicked=_coregistration_3d_to_3d, is_clickable=_if_a_database_is_open)
-action_coregister_series_2d_to_2d = Action('Coregister series to mean (2D)', on_clicked=_coregister_series_2d_to_2d, is_clickable=_if_a_series_is_selected)
-action_mdr_constant_2d = Action('Model-driven registration (constant - 2D)', on_clicked=_mdr_constant_2d, is_clickable=_if_a_series_is_selected)
-action_mdr_constant_3d = Action('Model-driven registration (constant - 3D)', on_clicked=_mdr_constant_3d, is_clickable=_if_a_series_is_selected)
+action_area_opening_2d = Action('Remove bright spots with area less than.. (2D)', on_clicked=_area_opening_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_area_opening_3d = Action('Remove bright spots with area less than.. (3D)', on_clicked=_area_opening_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_area_closing_2d = Action('Remove dark spots with area less than.. (2D)', on_clicked=_area_closing_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_area_closing_3d = Action('Remove dark spots with area less than.. (3D)', on_clicked=_area_closing_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_opening_2d = Action('Remove bright spots (2D)', on_clicked=_opening_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_opening_3d = Action('Remove bright spots (3D)', on_clicked=_opening_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_closing_2d = Action('Remove dark spots (2D)', on_clicked=_closing_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_closing_3d = Action('Remove dark spots (3D)', on_clicked=_closing_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_remove_small_holes_2d = Action('Remove small holes (2D)', on_clicked=_remove_small_holes_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_remove_small_holes_3d = Action('Remove small holes (3D)', on_clicked=_remove_small_holes_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_skeletonize_2d = Action('Skeletonize (2D)', on_clicked=_skeletonize_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_skeletonize_3d = Action('Skeletonize (3D)', on_clicked=_skeletonize_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_convex_hull_image_2d = Action('Convex Hull (2D)', on_clicked=_convex_hull_image_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_convex_hull_image_3d = Action('Convex Hull (3D)', on_clicked=_convex_hull_image_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_canny = Action('Canny Edge Detection', on_clicked=_canny, is_clickable=_if_a_series_is_selected, background=True)
+action_peak_local_max_3d = Action('Peak local maximum (3D)', on_clicked=_peak_local_max_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_watershed_2d = Action('Watershed (2D)', on_clicked=_watershed_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_watershed_3d = Action('Watershed (3D)', on_clicked=_watershed_3d, is_clickable=_if_a_series_is_selected, background=True)
+action_warp = Action('Warp', on_clicked=_warp, is_clickable=_if_a_database_is_open, background=True)
+action_coregistration_2d_to_2d = Action('Coregister (2D to 2D)', on_clicked=_coregistration_2d_to_2d, is_clickable=_if_a_database_is_open, background=True)
+action_coregistration_3d_to_3d = Action('Coregister (3D to 3D)', on_clicked=_coregistration_3d_to_3d, is_clickable=_if_a_database_is_open, background=True)
+action_coregister_series_2d_to_2d = Action('Coregister series to mean (2D)', on_clicked=_coregister_series_2d_to_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_mdr_constant_2d = Action('Model-driven registration (constant - 2D)', on_clicked=_mdr_constant_2d, is_clickable=_if_a_series_is_selected, background=True)
+action_mdr_constant_3d = Action('Model-driven registration (constant - 3D)', on_clicked=_mdr_constant_3d, is_clickable=_if_a_series_is_selected, background=True)
 
 
 menu_edit = Menu('Edit mask')
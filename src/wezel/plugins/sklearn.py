@@ -99,9 +99,9 @@ def calculate_sequential_k_means(app):
 
 
 
-action_k_means = Action('K-Means clustering', on_clicked=calculate_k_means, is_clickable=if_a_database_is_open)
-action_sequential_k_means = Action('K-Means clustering (sequential)', on_clicked=calculate_sequential_k_means, is_clickable=if_a_database_is_open)
-action_k_means_4d = Action('K-Means clustering (time series)', on_clicked=k_means_4d, is_clickable=if_a_database_is_open)
+action_k_means = Action('K-Means clustering', on_clicked=calculate_k_means, is_clickable=if_a_database_is_open, background=True)
+action_sequential_k_means = Action('K-Means clustering (sequential)', on_clicked=calculate_sequential_k_means, is_clickable=if_a_database_is_open, background=True)
+action_k_means_4d = Action('K-Means clustering (time series)', on_clicked=k_means_4d, is_clickable=if_a_database_is_open, background=True)
 
 
 menu_all = Menu('sklearn')
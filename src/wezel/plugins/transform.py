@@ -25,7 +25,7 @@ def series_multislice_to_volume(app):
     app.refresh()
 
 
-action_ms_to_vol = Action('2D multislice -> 3D volume', on_clicked=series_multislice_to_volume, is_clickable=is_series_selected)
+action_ms_to_vol = Action('2D multislice -> 3D volume', on_clicked=series_multislice_to_volume, is_clickable=is_series_selected, background=True)
 
 
 menu = Menu('Transform')
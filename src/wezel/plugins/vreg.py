@@ -272,18 +272,18 @@ def _roi_histogram(app):
     app.status.hide()
 
 
-action_overlay_on = Action('Overlay on..', on_clicked=_overlay_on, is_clickable=_if_a_database_is_open)
+action_overlay_on = Action('Overlay on..', on_clicked=_overlay_on, is_clickable=_if_a_database_is_open, background=True)
 action_roi_statistics = Action('ROI statistics', on_clicked=_roi_statistics, is_clickable=_if_a_database_is_open)
 action_roi_histogram = Action('ROI histogram', on_clicked=_roi_histogram, is_clickable=_if_a_database_is_open)
 
-action_translation = Action('Translation', on_clicked=_translation, is_clickable=_if_a_database_is_open)
-action_rigid = Action('Rigid transformation', on_clicked=_rigid, is_clickable=_if_a_database_is_open)
-action_rigid_around_com_sos = Action('Rigid around center of mass (cost = sum of squares)', on_clicked=_rigid_around_com_sos, is_clickable=_if_a_database_is_open)
+action_translation = Action('Translation', on_clicked=_translation, is_clickable=_if_a_database_is_open, background=True)
+action_rigid = Action('Rigid transformation', on_clicked=_rigid, is_clickable=_if_a_database_is_open, background=True)
+action_rigid_around_com_sos = Action('Rigid around center of mass (cost = sum of squares)', on_clicked=_rigid_around_com_sos, is_clickable=_if_a_database_is_open, background=True)
 
-action_sbs_inslice_translation = Action('Slice-by-slice in-slice translation', on_clicked=_sbs_inslice_translation, is_clickable=_if_a_database_is_open)
-action_sbs_translation = Action('Slice-by-slice translation', on_clicked=_sbs_translation, is_clickable=_if_a_database_is_open)
-action_sbs_rigid = Action('Slice-by-slice rigid transformation', on_clicked=_sbs_rigid, is_clickable=_if_a_database_is_open)
-action_sbs_rigid_around_com_sos = Action('Slice-by-slice rigid around center of mass (cost = sum of squares)', on_clicked=_sbs_rigid_around_com_sos, is_clickable=_if_a_database_is_open)
+action_sbs_inslice_translation = Action('Slice-by-slice in-slice translation', on_clicked=_sbs_inslice_translation, is_clickable=_if_a_database_is_open, background=True)
+action_sbs_translation = Action('Slice-by-slice translation', on_clicked=_sbs_translation, is_clickable=_if_a_database_is_open, background=True)
+action_sbs_rigid = Action('Slice-by-slice rigid transformation', on_clicked=_sbs_rigid, is_clickable=_if_a_database_is_open, background=True)
+action_sbs_rigid_around_com_sos = Action('Slice-by-slice rigid around center of mass (cost = sum of squares)', on_clicked=_sbs_rigid_around_com_sos, is_clickable=_if_a_database_is_open, background=True)
 
 
 menu_meas = Menu('Measure (vreg)')
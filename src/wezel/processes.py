@@ -0,0 +1,287 @@
+"""
+Run CPU-heavy pixel computations in a pool of processes.
+
+Worker threads share one core because of the GIL. map_pixels splits a
+pixel array into blocks and computes them in separate processes, which
+read the array from shared memory and return their results.
+
+dbdicom does not coordinate access to a database between processes - or
+between threads. Only the main process uses the database, and guard() 
+makes each call to its manager hold the database lock. No thread holds 
+the lock for longer than a call, so that background jobs and the GUI 
+can use the database in turn. Displays only try the lock, and read 
+ahead what they cannot show yet.
+"""
+import os
+import inspect
+import functools
+import threading
+import contextlib
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+
+
+class DatabaseLock():
+    """Re-entrant lock held by a thread while it uses the database.
+
+    A thread holding the lock can lend it to the GUI thread while it 
+    waits for the GUI thread, so that the GUI can use the database 
+    on its behalf.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._owner = None
+        self._count = 0
+        self._lender = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        me = threading.get_ident()
+        with self._condition:
+            if self._owner == me:
+                self._count += 1
+                return True
+            if not blocking:
+                if self._owner is not None:
+                    return False
+            else:
+                if timeout < 0:
+                    timeout = None
+                if not self._condition.wait_for(lambda: self._owner is None, timeout):
+                    return False
+            self._owner = me
+            self._count = 1
+            return True
+
+    def held(self):
+        """True if the current thread holds the lock"""
+        return self._owner == threading.get_ident()
+
+    def release(self):
+        with self._condition:
+            if self._owner != threading.get_ident():
+                raise RuntimeError('The database lock is held by another thread.')
+            self._count -= 1
+            if self._count == 0:
+                self._owner = None
+                self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    def lent(self):
+        """True if the lock is used on behalf of a thread that holds it"""
+        return self._lender is not None
+
+    @contextlib.contextmanager
+    def lend(self, owner):
+        """Let the current thread use the lock if owner holds it.
+
+        owner is the ident of a thread that waits for the current thread
+        until the context exits.
+        """
+        me = threading.get_ident()
+        with self._condition:
+            lending = self._owner == owner and owner != me
+            if lending:
+                self._owner = me
+                self._lender = owner
+        try:
+            yield
+        finally:
+            if lending:
+                with self._condition:
+                    self._owner = owner
+                    self._lender = None
+
+
+# Held while the database is in use
+lock = DatabaseLock()
+
+# Methods of a dbdicom Manager that only read the database
+_READS = set([
+    'type', 'tree', 'keys', 'value', 'parent', 'filter', 'filter_instances', 
+    'instances', 'series', 'studies', 'patients', 'get_instance_dataset', 
+    'get_dataset', '_get_values', 'get_values', 'series_header', 'study_header', 
+    'patient_header', 'label', 'print', 'print_database', 'print_patient', 
+    'print_study', 'print_series', 'print_instance', 'read', 'filepath', 
+    'filepaths', 'npy', '_pkl', 'is_saved', 'is_open', 'default', 'new_key', 
+    'new_instance_number', 'new_series_number', 'write_csv', '_empty', 
+    '_dbloc', '_keys', '_at', '_extract', '_loc', '_extract_record',
+])
+
+# Methods of a dbdicom Manager that can create series
+_CREATES = set([
+    'new_series', 'copy_to_study', 'copy_to_patient', 'copy_to_database', 
+    'import_datasets', 'import_datasets_from_nifti',
+])
+
+# What the current thread is tracking - see tracked()
+_local = threading.local()
+
+_poolLock = threading.Lock()
+_pool = None
+
+
+def map_pixels(func, array, *args, status=None, blocks=None, **kwargs):
+    """Compute func(array, *args, **kwargs) block by block in separate processes.
+
+    func must act on each pixel independently, and must be defined at the
+    top level of a module so that the processes can import it. The array
+    is split into blocks along its first dimension, and func returns an
+    array, or a tuple of arrays, with the same first dimension as its
+    input. The results are joined again and returned in the same form.
+
+    If a status bar is provided, progress is shown after each block -
+    so that the computation can be cancelled there too.
+    """
+    pool = _processPool()
+    if blocks is None:
+        blocks = 4*os.cpu_count()
+    blocks = min(blocks, array.shape[0])
+    if blocks < 2:
+        return func(array, *args, **kwargs)
+    array = np.ascontiguousarray(array)
+    edges = np.linspace(0, array.shape[0], blocks+1).astype(int)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    futures = {}
+    try:
+        np.ndarray(array.shape, array.dtype, buffer=shm.buf)[:] = array
+        for b in range(blocks):
+            future = pool.submit(_block, func, shm.name, array.shape, array.dtype,
+                edges[b], edges[b+1], args, kwargs)
+            futures[future] = b
+        results = [None]*blocks
+        for n, future in enumerate(as_completed(futures)):
+            results[futures[future]] = future.result()
+            if status is not None:
+                status.progress(n+1, blocks, 'Computing in parallel..')
+    finally:
+        # If stopped early, let running blocks finish before the memory goes.
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        shm.close()
+        shm.unlink()
+    if isinstance(results[0], (tuple, list)):
+        return tuple([np.concatenate(r, axis=0) for r in zip(*results)])
+    return np.concatenate(results, axis=0)
+
+
+def write(func, *args, **kwargs):
+    """Call a function that writes to the database, holding the database lock"""
+    _beforeWrite()
+    with lock:
+        return func(*args, **kwargs)
+
+
+def guard(manager):
+    """Make each call to the methods of a dbdicom Manager hold the database lock.
+
+    The methods are replaced on the instance, so that calls between 
+    methods of the manager are guarded too.
+    """
+    if getattr(manager, '_guarded', False):
+        return manager
+    for name in dir(type(manager)):
+        if name.startswith('__'):
+            continue
+        method = getattr(manager, name)
+        if inspect.ismethod(method):
+            setattr(manager, name, _guarded(manager, name, method))
+    manager._guarded = True
+    return manager
+
+
+@contextlib.contextmanager
+def tracked(beforeWrite=None):
+    """Collect the uids of the series that the current thread creates.
+
+    Only series created through a guarded manager are collected. 
+    beforeWrite is called before each database call that writes, 
+    when the thread does not hold the lock yet. 
+    """
+    created = set()
+    _local.created = created
+    _local.beforeWrite = beforeWrite
+    try:
+        yield created
+    finally:
+        _local.created = None
+        _local.beforeWrite = None
+
+
+def _guarded(manager, name, method):
+    write = name not in _READS
+    creates = name in _CREATES
+    @functools.wraps(method)
+    def call(*args, **kwargs):
+        if write:
+            _beforeWrite()
+        with lock:
+            created = getattr(_local, 'created', None)
+            if not creates or created is None or getattr(_local, 'creating', False):
+                return method(*args, **kwargs)
+            _local.creating = True
+            before = _series(manager)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                _local.creating = False
+                created.update(_series(manager) - before)
+    return call
+
+
+def _beforeWrite():
+    # Not while the lock is held: the hook may wait, or raise.
+    hook = getattr(_local, 'beforeWrite', None)
+    if hook is not None and not lock.held():
+        hook()
+
+
+def _series(manager):
+    # Uids of all series in the register
+    return set(manager.register['SeriesInstanceUID'].values)
+
+
+def _processPool():
+    global _pool
+    with _poolLock:
+        if _pool is None:
+            # Qt runs threads in the main process, which cannot be
+            # safely forked, so processes are started afresh.
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count(),
+                mp_context=mp.get_context('spawn'))
+    return _pool
+
+
+def _block(func, name, shape, dtype, start, stop, args, kwargs):
+    # Runs in a worker process
+    shm = _attach(name)
+    array = np.ndarray(shape, dtype, buffer=shm.buf)
+    try:
+        result = func(array[start:stop], *args, **kwargs)
+        # Results must not refer to the shared memory after it is closed
+        if isinstance(result, (tuple, list)):
+            return tuple([np.array(r) for r in result])
+        return np.array(result)
+    finally:
+        del array
+        shm.close()
+
+
+def _attach(name):
+    # The main process owns the shared memory and unlinks it when done.
+    # Before Python 3.13 the processes always register the memory, but
+    # with the resource tracker of the main process, which unregisters it.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError: 
+        return shared_memory.SharedMemory(name=name)
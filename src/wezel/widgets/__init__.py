@@ -5,6 +5,11 @@ in `wezel` applications.
 """
 
 #from .log_to_GUI import *
+from .log_to_GUI import (
+    Worker,
+    GuiInvoker,
+    GuiProxy,
+)
 
 from .dbimage import (
     ImageWindow,
@@ -29,6 +34,8 @@ from .main_mdi import (
 from .message import (
     Dialog, 
     StatusBar,
+    CancelToken,
+    Cancelled,
 )
 from .user_input import (
     UserInput,
@@ -39,6 +46,10 @@ from .dbdatabase import (
 from .region_list import (
     RegionList,
 )
+from .job_queue import (
+    Job,
+    JobQueue,
+)
 from .file_display import (
     ImageLabel,
     MatplotLib,
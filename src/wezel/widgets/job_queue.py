@@ -0,0 +1,261 @@
+import time
+import threading
+
+from PySide2.QtCore import Qt, Signal, QThreadPool, QTimer
+from PySide2.QtWidgets import (
+    QWidget,
+    QLabel,
+    QSpinBox,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QAbstractItemView,
+    QHeaderView,
+    QHBoxLayout,
+    QVBoxLayout,
+)
+
+from .message import CancelToken
+
+
+class Job():
+    """A task run by the JobQueue.
+
+    worker is the Worker that runs the task. series is the set of uids of
+    the series the task works on, or None if it may use the whole database.
+    memory is an estimate of the memory it needs, in bytes.
+
+    The worker starts as soon as the job is queued, so that it can ask 
+    for its parameters straight away. It then calls wait() before it 
+    reports progress or writes to the database, and only continues when 
+    the scheduler has started the job.
+    """
+
+    def __init__(self, name, series=None, memory=0):
+        self.name = name
+        self.worker = None
+        self.series = series
+        self.memory = memory
+        self.token = CancelToken()
+        self.state = 'Queued'
+        self.ready = False # True when waiting for the scheduler
+        self.queued = time.time()
+        self.started = None
+        self.finished = None
+        self._queue = None
+        self._admitted = threading.Event()
+
+    def wait(self):
+        """Wait until the scheduler starts the job - called by the worker"""
+        if not self.token.cancelled:
+            self._queue._ready.emit(self)
+            self._admitted.wait()
+
+    def waited(self):
+        if self.started is not None:
+            return self.started - self.queued
+        if self.finished is not None:
+            return self.finished - self.queued
+        return time.time() - self.queued
+
+    def ran(self):
+        if self.started is None:
+            return None
+        if self.finished is None:
+            return time.time() - self.started
+        return self.finished - self.started
+
+
+class JobQueue(QWidget):
+    """Panel listing the queued, running and finished jobs.
+
+    The scheduler starts queued jobs in order, with at most concurrency
+    jobs running at the same time and the memory of the running jobs
+    within memoryBudget. A job also waits while an earlier job on one of
+    its series is queued or running, so that jobs on the same series run
+    in the order in which they were queued and jobs on different series
+    can run in parallel. A job without series waits for all earlier jobs.
+    Running jobs take turns on the database lock of wezel.processes 
+    for each database call only, and otherwise run in parallel.
+    """
+
+    columns = ['Job', 'Series', 'State', 'Waited', 'Ran']
+
+    # Jobs wait for the scheduler in their own thread
+    maxQueued = 256
+
+    # Emitted from the worker of a job that is ready to start
+    _ready = Signal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = []
+        self.concurrency = 1
+        self.memoryBudget = 4*2**30
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(self.maxQueued)
+        self._ready.connect(self._setReady, Qt.QueuedConnection)
+        self._defineWidgets()
+        self._defineConnections()
+        self._defineLayout()
+
+    def _defineWidgets(self):
+        self.table = QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels(self.columns)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.concurrencyBox = QSpinBox()
+        self.concurrencyBox.setRange(1, max(1, QThreadPool.globalInstance().maxThreadCount()))
+        self.concurrencyBox.setValue(self.concurrency)
+        self.concurrencyBox.setToolTip('Maximum number of jobs running at the same time')
+        self.memoryBox = QSpinBox()
+        self.memoryBox.setRange(1, 1024)
+        self.memoryBox.setSuffix(' GB')
+        self.memoryBox.setValue(int(self.memoryBudget/2**30))
+        self.memoryBox.setToolTip('Maximum memory of the jobs running at the same time')
+        self.btnCancel = QPushButton('Cancel')
+        self.btnCancel.setToolTip('Cancel the selected jobs')
+        self.btnClear = QPushButton('Clear')
+        self.btnClear.setToolTip('Remove the jobs that are done from the list')
+        self.timer = QTimer()
+        self.timer.setInterval(1000)
+
+    def _defineConnections(self):
+        self.concurrencyBox.valueChanged.connect(self.setConcurrency)
+        self.memoryBox.valueChanged.connect(lambda gb: self.setMemoryBudget(gb*2**30))
+        self.btnCancel.clicked.connect(self.cancelSelected)
+        self.btnClear.clicked.connect(self.clear)
+        self.timer.timeout.connect(self.setView)
+
+    def _defineLayout(self):
+        row = QHBoxLayout()
+        row.addWidget(QLabel('Parallel jobs:'))
+        row.addWidget(self.concurrencyBox)
+        row.addWidget(QLabel('Memory:'))
+        row.addWidget(self.memoryBox)
+        row.addStretch()
+        row.addWidget(self.btnCancel)
+        row.addWidget(self.btnClear)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(row)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+    def add(self, job):
+        """Queue a job and start it when the scheduler allows"""
+        job.worker.signals.error.connect(lambda error, job=job: self._failed(job))
+        job.worker.signals.finished.connect(lambda job=job: self._finished(job))
+        job._queue = self
+        self.jobs.append(job)
+        self.pool.start(job.worker)
+        self.setView()
+
+    def setConcurrency(self, n):
+        self.concurrency = n
+        self.schedule()
+
+    def setMemoryBudget(self, nbytes):
+        self.memoryBudget = nbytes
+        self.schedule()
+
+    def schedule(self):
+        """Start the queued jobs that can run now"""
+        running = [job for job in self.jobs if job.state == 'Running']
+        memory = sum([job.memory for job in running])
+        busy = [job.series for job in running]
+        for job in self.jobs:
+            if len(running) >= self.concurrency:
+                break
+            if job.state != 'Queued':
+                continue
+            if job.ready:
+                fits = running == [] or memory + job.memory <= self.memoryBudget
+                if fits and _independent(job.series, busy):
+                    self._start(job)
+                    running.append(job)
+                    memory += job.memory
+            busy.append(job.series)
+        self.setView()
+
+    def cancelSelected(self):
+        rows = set([index.row() for index in self.table.selectedIndexes()])
+        for row in rows:
+            job = self.jobs[row]
+            if job.state in ['Queued', 'Running']:
+                # A queued job stops waiting and ends.
+                job.token.cancel()
+                job._admitted.set()
+        self.setView()
+
+    def clear(self):
+        self.jobs = [job for job in self.jobs if job.state in ['Queued', 'Running']]
+        self.setView()
+
+    def setView(self):
+        self.table.setRowCount(len(self.jobs))
+        for row, job in enumerate(self.jobs):
+            state = job.state
+            if state == 'Queued' and not job.ready:
+                state = 'Preparing'
+            if job.token.cancelled and state in ['Queued', 'Running']:
+                state = 'Cancelling'
+            series = 'All' if job.series is None else str(len(job.series))
+            ran = job.ran()
+            values = [
+                job.name,
+                series,
+                state,
+                _seconds(job.waited()),
+                '' if ran is None else _seconds(ran),
+            ]
+            for col, value in enumerate(values):
+                item = self.table.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.table.setItem(row, col, item)
+                item.setText(value)
+        active = [job for job in self.jobs if job.state in ['Queued', 'Running']]
+        if active == []:
+            self.timer.stop()
+        elif not self.timer.isActive():
+            self.timer.start()
+
+    def _setReady(self, job):
+        job.ready = True
+        self.schedule()
+
+    def _start(self, job):
+        job.state = 'Running'
+        job.started = time.time()
+        job._admitted.set()
+
+    def _failed(self, job):
+        job.state = 'Failed'
+
+    def _finished(self, job):
+        job.finished = time.time()
+        if job.state in ['Queued', 'Running']:
+            if job.token.cancelled:
+                job.state = 'Cancelled'
+            else:
+                job.state = 'Finished'
+        self.schedule()
+
+
+def _independent(series, busy):
+    # Check that a job on series can run alongside the busy ones
+    if series is None:
+        return busy == []
+    for other in busy:
+        if other is None:
+            return False
+        if not series.isdisjoint(other):
+            return False
+    return True
+
+
+def _seconds(t):
+    return str(round(t, 1)) + ' s'
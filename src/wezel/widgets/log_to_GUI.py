@@ -4,11 +4,13 @@ on the GUI from a calculation running in its own thread.
 """
 import sys
 import datetime
+import threading
 import traceback
-from PySide2.QtCore import (QObject, QRunnable, QThreadPool, Signal, Slot)
+from PySide2.QtCore import (QObject, QRunnable, QThreadPool, QThread, Qt, Signal, Slot)
 from PySide2.QtWidgets import (QVBoxLayout, QWidget, QPlainTextEdit)
 
 import wezel
+from wezel import processes
 import time
 import numpy as np
 import os
@@ -85,6 +87,74 @@ class Worker(QRunnable):
               self.signals.finished.emit() # Finished
 
 
+class GuiInvoker(QObject):
+      """
+      Calls functions in the GUI thread on behalf of a worker thread.
+
+      The worker thread waits until the function has returned, and then 
+      gets its return value - or its exception, which is raised again in 
+      the worker thread. Calls from the GUI thread itself are made directly.
+      If the worker thread holds the database lock, it is lent to the GUI 
+      thread for the call.
+
+      The invoker must be created in the GUI thread.
+      """
+      _call = Signal(object)
+
+      def __init__(self):
+          super().__init__()
+          self._call.connect(self._run, Qt.BlockingQueuedConnection)
+
+      def invoke(self, func, *args, **kwargs):
+          if QThread.currentThread() == self.thread():
+              return func(*args, **kwargs)
+          call = {'func':func, 'args':args, 'kwargs':kwargs, 'result':None, 'error':None,
+              'thread':threading.get_ident()}
+          self._call.emit(call)
+          if call['error'] is not None:
+              raise call['error']
+          return call['result']
+
+      @Slot(object)
+      def _run(self, call):
+          try:
+              with processes.lock.lend(call['thread']):
+                  call['result'] = call['func'](*call['args'], **call['kwargs'])
+          except Exception as e:
+              call['error'] = e
+
+
+class GuiProxy():
+      """
+      Wraps an object so that it can be used from a worker thread.
+
+      Its methods are called in the GUI thread through a GuiInvoker. 
+      Attributes and return values that are QObjects are wrapped in turn, 
+      except for the attributes listed in threadSafe, which are returned 
+      as they are.
+      """
+      def __init__(self, obj, invoker, threadSafe=[]):
+          self._obj = obj
+          self._invoker = invoker
+          self._threadSafe = threadSafe
+
+      def __getattr__(self, name):
+          attr = getattr(self._obj, name)
+          if name in self._threadSafe:
+              return attr
+          if isinstance(attr, QObject):
+              return GuiProxy(attr, self._invoker)
+          if callable(attr):
+              return lambda *args, **kwargs: self._wrap(
+                  self._invoker.invoke(attr, *args, **kwargs))
+          return attr
+
+      def _wrap(self, value):
+          if isinstance(value, QObject):
+              return GuiProxy(value, self._invoker)
+          return value
+
+
 class LoggingWidget(QWidget):
     """
     This class creates a custom composite widget that displays status updates
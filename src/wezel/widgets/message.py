@@ -1,6 +1,9 @@
+import functools
+import threading
+import time
 import traceback
 
-from PySide2.QtCore import Qt
+from PySide2.QtCore import Qt, Signal, QThread, QTimer
 from PySide2.QtGui import QCursor, QPixmap
 from PySide2.QtWidgets import (    
     QApplication,                          
@@ -9,9 +12,20 @@ from PySide2.QtWidgets import (
     QFileDialog, 
     QMessageBox, 
     QMessageBox, 
+    QLabel,
+    QPushButton,
 )
 
-from wezel import icons, widgets
+from wezel import icons, widgets, processes
+from wezel.widgets.log_to_GUI import GuiInvoker
+
+
+def _in_gui_thread(method):
+    # Dialogs opened from a worker thread are shown by the GUI thread
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._invoker.invoke(method, self, *args, **kwargs)
+    return wrapper
 
 
 class Dialog():
@@ -19,23 +33,35 @@ class Dialog():
     def __init__(self, parent=None):
 
         self.parent = parent
+        self._invoker = GuiInvoker()
 
+    @_in_gui_thread
     def information(self, message="Message in the box", title="Information"):
         """
         Information message. Press 'OK' to continue.
         """
         QMessageBox.information(self.parent, title, message)
 
+    @_in_gui_thread
     def warning(self, message="Message in the box", title="Warning"):
         """
         Warning message. Press 'OK' to continue.
         """
         QMessageBox.warning(self.parent, title, message)
 
-    def error(self, title=None, message=None, detail=None):
+    def error(self, title=None, message=None, detail=None, trace=None):
         """
         Error message. Press 'OK' to continue.
+
+        The trace is shown as detailed text. By default this is the 
+        traceback of the exception that is being handled.
         """
+        if trace is None:
+            # Read in the calling thread - the message box is shown in the GUI thread.
+            trace = traceback.format_exc()
+        self._invoker.invoke(self._error, title, message, detail, trace)
+
+    def _error(self, title, message, detail, trace):
         if title is None:
             title = "  Oops..."
         if message is None:
@@ -49,10 +75,11 @@ class Dialog():
         msg.setWindowTitle(title)
         msg.setText(message)
         msg.setInformativeText(detail)
-        msg.setDetailedText(traceback.format_exc())
+        msg.setDetailedText(trace)
         msg.setStandardButtons(QMessageBox.Ok)
         retval = msg.exec_() # value of pressed message box button
 
+    @_in_gui_thread
     def directory(self, message='Please select a folder', datafolder=None):
         """
         Select a directory.
@@ -63,6 +90,7 @@ class Dialog():
             directory = datafolder, 
             options = QFileDialog.ShowDirsOnly)
 
+    @_in_gui_thread
     def files(self, 
         title = 'Select files..', 
         initial_folder = None, 
@@ -81,6 +109,7 @@ class Dialog():
         names, _ = QFileDialog.getOpenFileNames(None, title, initial_folder, extension)
         return names
 
+    @_in_gui_thread
     def question(self, message="Do you wish to proceed?", title="Question for the user", cancel=False):
         """
         Displays a question window in the User Interface.
@@ -102,6 +131,7 @@ class Dialog():
         elif reply == QMessageBox.No: return "No"
         elif reply == QMessageBox.Cancel: return "Cancel"
 
+    @_in_gui_thread
     def file_to_open(self, 
         title = 'Open file..', 
         initial_folder = None, 
@@ -117,6 +147,7 @@ class Dialog():
             return None
         return filename
 
+    @_in_gui_thread
     def file_to_save(self, title='Save as ...', directory=None, filter="All files (*.*)", datafolder=None):
         """
         Select a filename to save.
@@ -127,6 +158,7 @@ class Dialog():
         if filename == '': return None
         return filename
 
+    @_in_gui_thread
     def input(self, *fields, title="User input window", helpText=""):
         """
         Collect user input of various types.
@@ -136,7 +168,58 @@ class Dialog():
         #return dialog.button=='Cancel', dialog.returnListParameterValues()
 
 
+class Cancelled(Exception):
+    """Raised in a background job when the user has cancelled it"""
+
+
+class CancelToken():
+    """Flag to cancel a background job.
+
+    The job checks the flag whenever it reports progress or a message 
+    to the StatusBar, and stops with a Cancelled exception once it is set.
+    Checks made while the job holds the database lock are skipped.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self.thread = None # id of the thread running the job
+        self.start = None # called in the job's thread at the first check
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        # Only the job itself is stopped, not other threads reporting progress.
+        if self.thread != threading.get_ident():
+            return
+        # Not in the middle of a database call
+        if processes.lock.held():
+            return
+        if self.start is not None:
+            start, self.start = self.start, None
+            start()
+        if self.cancelled:
+            raise Cancelled()
+
+
 class StatusBar(QStatusBar):
+    """Status bar showing messages and progress.
+
+    Progress updates are shown at most once every updateInterval 
+    seconds. Updates in between are coalesced: only the last one is 
+    shown, when the interval has passed. The final update of a loop 
+    (value >= total) is always shown immediately. The number of 
+    coalesced updates is counted in coalesced.
+    """
+
+    updateInterval = 0.05 # seconds (20 Hz)
+
+    # Updates from worker threads are passed 
+    # to the GUI thread through these signals.
+    _hide = Signal()
+    _message = Signal(object)
+    _progress = Signal(object, object, object)
+    _flush = Signal()
 
     def __init__(self):
         super().__init__()
@@ -144,33 +227,134 @@ class StatusBar(QStatusBar):
         self.progressBar = QProgressBar()
         self.progressBar.setFixedHeight(10)
         self.addPermanentWidget(self.progressBar)
+        self.jobs = [] # names of background jobs
+        self.jobLabel = QLabel()
+        self.jobLabel.hide()
+        self.addPermanentWidget(self.jobLabel)
+        self.cancelTokens = [] # of the jobs that are running
+        self.cancelButton = QPushButton('Cancel')
+        self.cancelButton.setToolTip('Cancel the running jobs')
+        self.cancelButton.clicked.connect(self.cancel)
+        self.cancelButton.hide()
+        self.addPermanentWidget(self.cancelButton)
+        self.coalesced = 0 # number of updates not shown
+        self._lock = threading.Lock()
+        self._lastUpdate = 0
+        self._pending = None # last progress update not shown
+        self._flushTimer = QTimer()
+        self._flushTimer.setSingleShot(True)
+        self._flushTimer.setInterval(int(1000*self.updateInterval))
+        self._flushTimer.timeout.connect(self._flushPending)
+        self._hide.connect(self.hide, Qt.QueuedConnection)
+        self._message.connect(self.message, Qt.QueuedConnection)
+        self._progress.connect(self._showProgress, Qt.QueuedConnection)
+        self._flush.connect(self._flushTimer.start, Qt.QueuedConnection)
         self.hide()
 
+    def _inWorkerThread(self):
+        return QThread.currentThread() != self.thread()
+
     def hide(self):
 
-        self.message('')
+        with self._lock:
+            self._pending = None
+        if self._inWorkerThread():
+            self._hide.emit()
+            return
+        self.showMessage('')
         self.progressBar.hide()
         QApplication.processEvents() # allow gui to update
 
     def message(self, message=None):
 
+        for token in list(self.cancelTokens):
+            token.check()
+        if self._inWorkerThread():
+            self._message.emit(message)
+            return
         if message == None: 
             message = ''
         self.showMessage(message)
-        QApplication.processEvents() # allow gui to update
+        if self._due(final=False):
+            QApplication.processEvents() # allow gui to update
 
     def progress(self, value, total, message=None):
 
+        for token in list(self.cancelTokens):
+            token.check()
+        if not self._due(total <= 1 or value >= total, (value, total, message)):
+            return
+        if self._inWorkerThread():
+            self._progress.emit(value, total, message)
+            return
+        self._showProgress(value, total, message)
+
+    def _due(self, final, update=None):
+        # Check if an update is to be shown now. If not, 
+        # the update is kept and shown when the interval has passed.
+        with self._lock:
+            now = time.monotonic()
+            if final or now - self._lastUpdate >= self.updateInterval:
+                self._lastUpdate = now
+                self._pending = None
+                return True
+            self.coalesced += 1
+            if update is not None:
+                if self._pending is None:
+                    self._flush.emit()
+                self._pending = update
+            return False
+
+    def _flushPending(self):
+        with self._lock:
+            update = self._pending
+            self._pending = None
+            self._lastUpdate = time.monotonic()
+        if update is not None:
+            self._showProgress(*update)
+
+    def _showProgress(self, value, total, message=None):
         if message is not None: 
-            self.message(message)
+            self.showMessage(message)
         if total > 1:
             self.progressBar.show()
             self.progressBar.setRange(0, total)
             self.progressBar.setValue(value)
         else:
             self.progressBar.hide()
+        self.progressBar.setToolTip(str(self.coalesced) + ' updates coalesced')
         QApplication.processEvents() # allow gui to update - prevent freezing
 
+    def jobStarted(self, name):
+        """Show that a background job has started"""
+        self.jobs.append(name)
+        self._showJobs()
+
+    def jobFinished(self, name):
+        """Show that a background job has finished"""
+        if name in self.jobs:
+            self.jobs.remove(name)
+        self._showJobs()
+
+    def cancel(self):
+        """Cancel the running jobs at their next progress update"""
+        if self.cancelTokens != []:
+            for token in list(self.cancelTokens):
+                token.cancel()
+            self.message('Cancelling..')
+
+    def _showJobs(self):
+        if self.jobs == []:
+            self.jobLabel.hide()
+            self.cancelButton.hide()
+            return
+        self.cancelButton.show()
+        text = 'Running: ' + self.jobs[0]
+        if len(self.jobs) > 1:
+            text += ' (+' + str(len(self.jobs)-1) + ' waiting)'
+        self.jobLabel.setText(text)
+        self.jobLabel.show()
+
     def cursorToHourglass(self):
         """
         Turns the arrow shape for the cursor into an hourglass. 
@@ -190,7 +374,9 @@ class StatusBar(QStatusBar):
                 if 0 <= y < array.shape[1]:
                     pixelValue = array[x,y]
                     text = "Signal ({}, {}) = {}".format(x, y, pixelValue)
-        self.message(text)
+        # Called on mouse moves, so no processEvents() 
+        # - the status bar is repainted by the event loop.
+        self.showMessage(text)
 
 
 
@@ -2,12 +2,20 @@
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 
+from PySide2.QtCore import QTimer
 from PySide2.QtWidgets import QWidget, QVBoxLayout
 
 
 
 
 class PlotCurve(QWidget):
+    """Plot of a single curve, with a marker at one of the points.
+
+    The axes are only redrawn when the limits or labels change. New data 
+    are drawn over a cached background of the axes (blitting), at most 
+    once every refreshInterval milliseconds.
+    """
+    refreshInterval = 16
 
     def __init__(self):
         super().__init__()
@@ -21,6 +29,16 @@ class PlotCurve(QWidget):
         self.yLim = None
        
         self.subPlot = self.figure.add_subplot(111)
+        self._line = None
+        self._marker = None
+        self._background = None
+        self._axesChanged = True
+        self.canvas.mpl_connect('draw_event', self._onDraw)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.refreshInterval)
+        self._timer.timeout.connect(self._blit)
 
         layout = QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
@@ -33,24 +51,48 @@ class PlotCurve(QWidget):
             if self.xLim[0] == self.xLim[1]:
                 self.xLim = [self.xLim[0]-1, self.xLim[0]+1]
         self.xLim = xLim
+        self._axesChanged = True
 
     def setYlim(self, yLim):
         if self.yLim is not None:
             if self.yLim[0] == self.yLim[1]:
                 self.yLim = [self.yLim[0]-1, self.yLim[0]+1]
         self.yLim = yLim
+        self._axesChanged = True
 
     def setXlabel(self, label):
         self.xLabel = label
+        self._axesChanged = True
 
     def setYlabel(self, label):
         self.yLabel = label
+        self._axesChanged = True
 
     def clear(self):
-        self.subPlot.clear()
-        self.canvas.draw()
+        if self._line is None:
+            return
+        self._line.set_visible(False)
+        self._marker.set_visible(False)
+        self._update()
 
     def setData(self, x, y, index=None):
+        if self._axesChanged:
+            self._setAxes()
+        self._line.set_data(x, y)
+        self._line.set_visible(True)
+        if index is not None:
+            self._marker.set_data([x[index]], [y[index]])
+        self._marker.set_visible(index is not None)
+        if self.xLim is None or self.yLim is None:
+            # Axes scaled to the data need a full redraw
+            self.subPlot.relim()
+            self.subPlot.autoscale_view()
+            self._background = None
+        self._update()
+
+    def _setAxes(self):
+        # Draw the axes without the curve - this is the background for blitting
+        self._axesChanged = False
         self.subPlot.clear()
         self.subPlot.tick_params(
             axis='both', 
@@ -67,7 +109,30 @@ class PlotCurve(QWidget):
             self.yLabel, loc='center', 
             fontsize=10)
         self.subPlot.grid(axis='y')
-        self.subPlot.plot(x, y)
-        if index is not None:
-            self.subPlot.plot(x[index], y[index], 'bo')
-        self.canvas.draw()
+        self._line, = self.subPlot.plot([], [], animated=True)
+        self._marker, = self.subPlot.plot([], [], 'bo', animated=True)
+        self._background = None
+
+    def _update(self):
+        # Throttle redraws to the refresh interval
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _blit(self):
+        if self._background is None:
+            # _onDraw() caches the background and draws the curve
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._background)
+        self._drawCurve()
+        self.canvas.blit(self.subPlot.bbox)
+
+    def _onDraw(self, event):
+        # Called after every full redraw, including when the widget is resized
+        self._background = self.canvas.copy_from_bbox(self.subPlot.bbox)
+        self._drawCurve()
+
+    def _drawCurve(self):
+        if self._line is not None:
+            self.subPlot.draw_artist(self._line)
+            self.subPlot.draw_artist(self._marker)
@@ -1,7 +1,7 @@
 from PySide2.QtGui import QIcon
 from PySide2.QtCore import Qt
 from PySide2.QtWidgets import (
-    QAction,
+    QAction, QMenu, QActionGroup,
     QWidget, 
     QComboBox, QToolBar, 
     QHBoxLayout, QVBoxLayout)
@@ -41,6 +41,18 @@ class RegionList(QWidget):
         self.btnDelete.setToolTip('Delete the current ROI')
         self.btnDelete.setIcon(QIcon(icons.minus))
         self.btnDelete.setEnabled(False)
+        self.btnFormat = QAction()
+        self.btnFormat.setToolTip('Format in which the ROIs are saved')
+        self.btnFormat.setIcon(QIcon(icons.disk))
+        self.menuFormat = QMenu()
+        group = QActionGroup(self.menuFormat)
+        for format in ['DICOM', 'Label map']:
+            action = QAction(format, self.menuFormat)
+            action.setCheckable(True)
+            action.setChecked(format == 'DICOM')
+            group.addAction(action)
+            self.menuFormat.addAction(action)
+        self.btnFormat.setMenu(self.menuFormat)
 
     def _defineLayoutVertical(self):
         column = QVBoxLayout()
@@ -51,6 +63,7 @@ class RegionList(QWidget):
         row.addAction(self.btnLoad)
         row.addAction(self.btnNew)
         row.addAction(self.btnDelete)
+        row.addAction(self.btnFormat)
         column.addWidget(row)
         self.setLayout(column)
 
@@ -59,6 +72,7 @@ class RegionList(QWidget):
         btns.addWidget(self.btnLoad)
         btns.addWidget(self.btnNew)
         btns.addWidget(self.btnDelete)
+        btns.addAction(self.btnFormat)
         layout = QHBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
@@ -72,12 +86,18 @@ class RegionList(QWidget):
         self.comboBox.clear()
         self.comboBox.addItems(regions)
         self.comboBox.setEnabled(regions != [])
+        memory = self.canvas.regionMemory()
+        for i, nbytes in enumerate(memory):
+            tip = 'Memory: ' + str(round(nbytes/1024, 1)) + ' kB'
+            self.comboBox.setItemData(i, tip, Qt.ToolTipRole)
         if regions != []:
             i = self.canvas.currentIndex()
             self.comboBox.setCurrentIndex(i)
             self.currentIndex = i
         self.comboBox.blockSignals(False)
         self.btnDelete.setEnabled(regions != [])
+        for action in self.menuFormat.actions():
+            action.setChecked(action.text() == self.canvas.regionFormat())
 
     def _defineConnections(self):
         self.comboBox.currentIndexChanged.connect(self.currentIndexChanged)
@@ -85,6 +105,8 @@ class RegionList(QWidget):
         self.btnLoad.triggered.connect(self._loadRegion)
         self.btnNew.triggered.connect(self._newRegion)
         self.btnDelete.triggered.connect(self._deleteRegion)
+        self.menuFormat.triggered.connect(
+            lambda action: self.canvas.setRegionFormat(action.text()))
 
     def currentIndexChanged(self):
         self.currentIndex = self.comboBox.currentIndex()
@@ -89,6 +89,8 @@ class SeriesSliders(QWidget):
         """
         # Add all default tags in the registry and get values
         tags = self.sliderTags.copy()  
+        self._index = {}
+        self._rows = {}
         if self.series is None:
             self.dataFrame = pd.DataFrame([], index=[], columns=tags)
             return
@@ -115,6 +117,25 @@ class SeriesSliders(QWidget):
         for tag in self.sliderTags.copy():
             if tag not in self.dataFrame:
                 self.sliderTags.remove(tag)
+        # row of each image, for looking up its slider values
+        uids = self.dataFrame.SOPInstanceUID.values
+        self._rows = dict(zip(uids, range(len(uids))))
+
+    def _buildIndex(self, labels):
+        """Map the values of the sliders in labels to the images they select.
+        
+        The images are listed in the order of the dataframe.
+        """
+        if 'SOPInstanceUID' not in self.dataFrame:
+            return {}
+        if labels == ():
+            return {(): self.dataFrame.SOPInstanceUID.values.tolist()}
+        index = {}
+        uids = self.dataFrame.SOPInstanceUID.values.tolist()
+        columns = [self.dataFrame[label].values.tolist() for label in labels]
+        for values, uid in zip(zip(*columns), uids):
+            index.setdefault(values, []).append(uid)
+        return index
 
 
     def _setSliderValueLists(self):
@@ -169,10 +190,9 @@ class SeriesSliders(QWidget):
 
         if self.image is None: 
             return
-        find = self.dataFrame.SOPInstanceUID == self.image.uid
-        row = self.dataFrame.loc[find]
+        row = self._rows[self.image.uid]
         for slider in self._activeSliders:
-            value = row[slider.label].values[0]
+            value = self.dataFrame[slider.label].values[row]
             slider.setValue(value)
 
     def _setMainSliderValue(self):
@@ -223,20 +243,19 @@ class SeriesSliders(QWidget):
             self.valueChanged.emit(self.image)
 
 
+    def imageUIDs(self):
+        """UIDs of the images on the main slider, in slider order"""
+        return self._getAllSelectedImages()
+
     def _getAllSelectedImages(self):
         """Get the list of all image files selected by the optional sliders"""
 
-        selection = pd.Series( 
-            index = self.dataFrame.index, 
-            data = self.dataFrame.shape[0] * [True]
-        )
-        for slider in self._activeSliders:
-            sliderSelection = self.dataFrame[slider.label] == slider.value()
-            selection = selection & sliderSelection
-        if not selection.any():
-            return []
-        else:
-            return self.dataFrame.SOPInstanceUID[selection].values.tolist()
+        active = self._activeSliders
+        labels = tuple([slider.label for slider in active])
+        if labels not in self._index:
+            self._index[labels] = self._buildIndex(labels)
+        values = tuple([slider.value() for slider in active])
+        return self._index[labels].get(values, [])
 
     @property
     def _activeSliders(self):
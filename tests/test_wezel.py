@@ -286,6 +286,153 @@ def test_SeriesCanvas(interactive = True):
     #remove_tmp_database(tmp_skull_ct)
 
 
+def test_ImageItem_render(interactive=True):
+
+    # Benchmark: frames per second when dragging the window
+    app = QApplication.instance() or QApplication(sys.argv)
+    for dtype in [np.int16, np.float32]:
+        for n in [512, 1024, 2048]:
+            array = np.random.normal(500, 200, (n, n)).astype(dtype)
+            lut = canvas.colormap_to_BGRA('viridis')
+            item = canvas.ImageItem(array, 500, 400, lut)
+            nframes = 20
+            start = timeit.default_timer()
+            for i in range(nframes):
+                item.setWindow(500+i, 400+2*i)
+                item.setDisplay()
+            stop = timeit.default_timer()
+            fps = nframes/(stop-start)
+            if interactive:
+                print('Render ' + np.dtype(dtype).name + ' at ' + str(n) + 'x' + str(n) + ': ' + str(round(fps, 1)) + ' frames per second')
+            assert item._qImage.width() == n
+
+
+def test_ImageItem_integers(interactive=True):
+
+    # Negative (CT in HU) and offset integer data look up a table
+    # of stored values, and show the same colours as floats.
+    app = QApplication.instance() or QApplication(sys.argv)
+    lut = canvas.colormap_to_BGRA('viridis')
+    rng = np.random.default_rng(0)
+    data = [
+        (np.int16, -1024, 3000),
+        (np.uint16, 1000, 1100),
+        (np.int32, -70000, -69000),
+    ]
+    for dtype, low, high in data:
+        array = rng.integers(low, high, (64, 48)).astype(dtype)
+        center, width = (low+high)//2, 2*((high-low)//4)
+        for itemClass in [canvas.ImageItem, canvas.IndexedImageItem]:
+            item = itemClass(array, center, width, lut)
+            assert item._values is not None
+            reference = itemClass(array.astype(np.float32), center, width, lut)
+            assert np.array_equal(item._pixels, reference._pixels)
+
+
+# Reference implementations of region growing by flood fill
+
+def region_grow_select_python(img, seed, min, max):
+    selected = np.zeros(img.shape, dtype=bool)
+    checked = np.zeros(img.shape, dtype=bool)
+    width, height = img.shape
+    neighbours = [ 
+        [0, -1], [1, 0], 
+        [0, 1], [-1, 0],
+    ]
+    while seed != []:
+        p = seed.pop()
+        if min <= img[p[0], p[1]] <= max:
+            selected[p[0], p[1]] = True
+        for next in neighbours:
+            x = p[0] + next[0]
+            y = p[1] + next[1]
+            if x < 0 or y < 0 or x >= width or y >= height:
+                continue
+            if not checked[x,y]:
+                checked[x,y] = True
+                if min <= img[x,y] <= max:
+                    seed.append([x,y])
+    return selected
+
+
+def region_grow_add_python(img, selected, seed, min, max):
+    width, height = img.shape
+    checked = np.copy(selected) 
+    neighbours = [ 
+        [0, -1], [1, 0], 
+        [0, 1], [-1, 0],
+    ]
+    while seed != []:
+        p = seed.pop()
+        if min <= img[p[0], p[1]] <= max:
+            selected[p[0], p[1]] = True
+        for next in neighbours:
+            x = p[0] + next[0]
+            y = p[1] + next[1]
+            if x < 0 or y < 0 or x >= width or y >= height:
+                continue
+            if not checked[x,y]:
+                checked[x,y] = True
+                if min <= img[x,y] <= max:
+                    seed.append([x,y])
+    return selected
+
+
+def region_grow_remove_python(img, selected, seed, min, max):
+    width, height = img.shape
+    checked = np.copy(np.logical_not(selected))
+    neighbours = [ 
+        [0, -1], [1, 0], 
+        [0, 1], [-1, 0],
+    ]
+    while seed != []:
+        p = seed.pop()
+        if min <= img[p[0], p[1]] <= max:
+            selected[p[0], p[1]] = False
+        for next in neighbours:
+            x = p[0] + next[0]
+            y = p[1] + next[1]
+            if x < 0 or y < 0 or x >= width or y >= height:
+                continue
+            if not checked[x,y]:
+                checked[x,y] = True
+                if min <= img[x,y] <= max:
+                    seed.append([x,y])
+    return selected
+
+
+def test_region_grow(interactive=True):
+
+    # Check against the flood fill on random images
+    rng = np.random.default_rng(0)
+    for i in range(200):
+        shape = tuple(rng.integers(1, 32, 2))
+        img = rng.integers(0, 4, shape)
+        seed = [[rng.integers(shape[0]), rng.integers(shape[1])] for _ in range(3)]
+        selected = rng.random(shape) < 0.3
+        assert np.array_equal(
+            canvas.utils.region_grow_select(img, seed, 1, 2),
+            region_grow_select_python(img, list(seed), 1, 2))
+        assert np.array_equal(
+            canvas.utils.region_grow_add(img, selected.copy(), seed, 1, 2),
+            region_grow_add_python(img, selected.copy(), list(seed), 1, 2))
+        assert np.array_equal(
+            canvas.utils.region_grow_remove(img, selected.copy(), seed, 1, 2),
+            region_grow_remove_python(img, selected.copy(), list(seed), 1, 2))
+
+    # Benchmark: selecting a region covering a 512x512 slice
+    img = np.ones((512, 512), dtype=np.int16)
+    start = timeit.default_timer()
+    region = region_grow_select_python(img, [[256, 256]], 0.5, 1.5)
+    python = timeit.default_timer() - start
+    start = timeit.default_timer()
+    region = canvas.utils.region_grow_select(img, [[256, 256]], 0.5, 1.5)
+    labels = timeit.default_timer() - start
+    if interactive:
+        print('Region growing at 512x512: ' + str(round(1000*python)) + ' ms (flood fill), ' + str(round(1000*labels, 1)) + ' ms (labels)')
+    assert region.all()
+
+
 if __name__ == "__main__":
 
     interactive=True
@@ -300,6 +447,9 @@ if __name__ == "__main__":
     # test_ImageColors(interactive)
     # test_Canvas(interactive)
     # test_SeriesCanvas(interactive)
+    # test_ImageItem_render(interactive)
+    # test_ImageItem_integers(interactive)
+    # test_region_grow(interactive)
 
 
     print('-----------------------')